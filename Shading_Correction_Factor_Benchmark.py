@@ -0,0 +1,334 @@
+# coding: utf-8
+
+# # 日よけ効果係数算定ツール  Benchmark
+#
+# - 一括計算(Modules F.)の各段階の計算量・計算時間の確認
+#
+
+# ## Y. ベンチマーク
+#
+
+# ### Y.1 時間刻みの格子(F.5)
+#
+# - `Nh`と太陽位置を別々に計算する場合(`calc_SolarTable_separate`)と、時間刻みの格子`TimeGrid`でまとめて計算する場合を比べる
+#   - 別々の計算は、`Nh`を正時±30分の時間刻み`(8761, NDT+1)`, 太陽位置を`(8760, NDT)`の太陽高度から求める(格子を作る前の計算, 比較用)
+#   - 太陽高度の正弦の計算回数と、計算時間(`Repeat`回の最小値[s])を出力する
+# - `python Shading_Correction_Factor_Benchmark.py timegrid --zone 6 --ndt 6`
+
+# In[1]:
+
+
+""" 時間刻みの格子のベンチマーク """
+import Shading_Correction_Factor_Modules as SCFModule
+import numpy as np
+import time
+
+def calc_SolarTable_separate(Latitude, Longitude, NDT):
+    # [Nh, deltad, eed, Tdt, sinh, cosh, hsdt, Azsdt] → TimeGrid.SolarTable と同じ形
+
+    """ 1年分の太陽位置(F.1), Hour00:0～8759 """
+    Hour00 = np.arange(8760)
+    NDay = Hour00 // 24 + 1
+    TT = (Hour00 - (NDay - 1) * 24)[:, None] + np.arange(NDT) / float(NDT)
+    deltad = SCFModule.calc_deltad_array(NDay)
+    eed = SCFModule.calc_eed(NDay)
+    Tdt = SCFModule.calc_Tdt(Longitude, eed[:, None], TT)
+    sinh = SCFModule.calc_sinh_array(Latitude, deltad[:, None], Tdt)
+    cosh = SCFModule.calc_cosh(sinh)
+    hsdt = SCFModule.calc_hsdt(cosh, sinh)
+    Azsdt = SCFModule.calc_Azsdt_array(Latitude, deltad[:, None], Tdt, sinh, cosh)
+
+    """ 正時±30分で太陽が地平線上にある時間刻み数のカウント(D.3), Hour00:0～8760 """
+    Hour00 = np.arange(8761)
+    NDay = np.minimum(Hour00 // 24 + 1, 365)
+    if NDT == 1:
+        TT = (Hour00 - (NDay - 1) * 24)[:, None] + np.zeros(1)
+    else:
+        TT = (Hour00 - (NDay - 1) * 24)[:, None] + np.arange(-int(NDT/2), int(NDT/2)+1) / NDT
+    SunUp = SCFModule.calc_sinh_array(Latitude, SCFModule.calc_deltad_array(NDay)[:, None],
+                                      SCFModule.calc_Tdt(Longitude, SCFModule.calc_eed(NDay)[:, None], TT)) > 0
+    Nh = SunUp.sum(axis=1, dtype=float)
+    if NDT > 1:
+        Nh -= 0.5 * SunUp[:, 0] + 0.5 * SunUp[:, -1]
+
+    return [Nh, deltad, eed, Tdt, sinh, cosh, hsdt, Azsdt]
+
+
+def Bench_TimeGrid(Latitude, Longitude, NDT, Repeat=5):
+
+    """ 太陽高度の正弦の計算回数 """
+        # 別々：Nh の (8761, NDT+1), 太陽位置の (8760, NDT)
+        # 格子：TimeGrid の (8762, NDT)
+    NSinh00 = 8761 * (NDT + 1) + 8760 * NDT
+    NSinh01 = SCFModule.TimeGrid(Latitude, Longitude, NDT).NSinh
+
+    """ 計算時間 """
+    Time00 = Time01 = float("inf")
+    for n in range(Repeat):
+        Start = time.perf_counter()
+        SolarTable00 = calc_SolarTable_separate(Latitude, Longitude, NDT)
+        Time00 = min(Time00, time.perf_counter() - Start)
+
+        Start = time.perf_counter()
+        SolarTable01 = SCFModule.TimeGrid(Latitude, Longitude, NDT).SolarTable()
+        Time01 = min(Time01, time.perf_counter() - Start)
+
+    """ 結果の一致の確認 """
+    Match = all(np.array_equal(x, y, equal_nan=True) for [x, y] in zip(SolarTable00, SolarTable01))
+
+    return {"NDT": NDT, "NSinh_separate": NSinh00, "NSinh_grid": NSinh01,
+            "Time_separate": Time00, "Time_grid": Time01, "Match": Match}
+
+
+# ### Y.2 段階毎の計算時間
+#
+# - 地域区分`ClimateZone`, 時間分割数`NDT`毎に、本体プログラム(Main X.1, `engine="numpy"`)と同じ処理の段階の計算時間を`Repeat`回計り、中央値と最小値[s]を返す
+#   - `zone_lookup`：地点データの台帳の作成と参照(D.1, `ZoneRegistry`)。毎回`\Zone.csv`から台帳を作り直す(キャッシュがない場合)
+#   - `weather_load`：気象データ読み込み(D.2, `input_SRData`, キャッシュあり)
+#   - `time_grid`：時間刻みの格子, `Nh`と太陽位置(F.3, F.5, `get_TimeGrid`)
+#   - `sun_index`：太陽が地平線上にある時間分割の索引(F.12, `get_SunIndex`)
+#   - `view_factors`：天空・反射日射の効果係数(C.3, C.5, `calc_gammayp_array`, `calc_gammaym_array`)
+#   - `sdhm`：`SunUp`の時間分割の法線面直達日射量, 水平面天空日射量(D.4, F.6, `calc_Sdhm_array`)
+#   - `ax`：`SunUp`の時間分割の直達日射が窓に射す部分の面積(B.7, F.2, `calc_Ax_array`)
+#   - `sunup_hours`：`SunUp`の時間分割毎の分子分母(F.10, `calc_SCF01_steps`)。`sdhm`, `ax`を含む
+#   - `aggregation`：分子分母の期間積算(E.3, `Output_ShadingCorrectionFactor`)
+#   - `total`：`Calc_ShadingCorrectionFactor`の1回分(地点毎のキャッシュは作成済み)
+# - `get_TimeGrid`, `get_SunIndex`はキャッシュを通さずに呼び、キャッシュがない(初回の)場合の時間を計る
+# - 窓は`BenchWindow`(窓面の方位, 入射角特性のID, 寸法)の1個とする
+# - 各段階は前段階の結果を使うので、1回目の計算結果を次の段階に渡す
+
+# In[2]:
+
+
+""" 段階毎の計算時間 """
+import Shading_Correction_Factor_Modules as SCFModule
+import Shading_Correction_Factor_Main as SCFMain
+import numpy as np
+import statistics
+import time
+
+BenchWindow = ["南", 1, [1.1, 2.1, 0.9, 1.05, 1.07, 0.88, 0.85, 0.98, 2.05, 1.02, 0.96, 0.92, 1.01, 0.97,
+                         0.24, 0.28, 0.21, 0.2]]
+BenchStages = ["zone_lookup", "weather_load", "time_grid", "sun_index", "view_factors", "sdhm", "ax",
+               "sunup_hours", "aggregation", "total"]
+
+def calc_BenchTime(Function, Repeat):
+    # Function を Repeat 回呼び出して、[[計算時間の中央値[s], 最小値[s]], 1回目の戻り値]を返す
+
+    Times = []
+    for n in range(Repeat):
+        Start = time.perf_counter()
+        Value = Function()
+        Times.append(time.perf_counter() - Start)
+        if n == 0:
+            Value00 = Value
+
+    return [[statistics.median(Times), min(Times)], Value00]
+
+
+def Bench_Stages(Path00, FileName00, FileName01, ClimateZone, NDT, Repeat=7):
+
+    [Azimuth, etaID, WSSize] = BenchWindow
+    Times = {}
+
+    # 台帳のキャッシュ(D.1)を通さずに、\Zone.csv の読み込みから計る
+    [Times["zone_lookup"], Point] = calc_BenchTime(
+        lambda: SCFModule.get_ZoneRegistry.__wrapped__(Path00, FileName00).Point(ClimateZone), Repeat)
+    [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] = Point
+
+    [Times["weather_load"], SRHour] = calc_BenchTime(
+        lambda: SCFModule.input_SRData(Path00, SRFileName, HStart, HEnd, CStart, CEnd), Repeat)
+
+    # キャッシュ(F.3, F.12)を通さずに計算する
+    [Times["time_grid"], Grid] = calc_BenchTime(
+        lambda: SCFModule.get_TimeGrid.__wrapped__(Latitude, Longitude, NDT), Repeat)
+
+    [etaID0, etamax, etaisr, etakk] = SCFModule.input_IncidentAngleCharacteristics(etaID, Path00, FileName01)
+    Azwj = SCFModule.calc_Azwj(Azimuth)
+    [Times["sun_index"], SunUp] = calc_BenchTime(
+        lambda: SCFModule.get_SunIndex.__wrapped__(Latitude, Longitude, NDT), Repeat)
+
+    [Times["view_factors"], [gammayp, gammaym]] = calc_BenchTime(
+        lambda: [SCFModule.calc_gammayp_array(WSSize), SCFModule.calc_gammaym_array(WSSize)], Repeat)
+
+    # calc_SCF01_steps(F.10)と同じ入力で、日射量の分離と面積の計算を別々に計る
+    [sinh, hsdt, Azsdt] = [Grid.Year(x).ravel()[SunUp] for x in [Grid.sinh, Grid.hsdt, Grid.Azsdt]]
+    [Times["sdhm"], Sdhm] = calc_BenchTime(
+        lambda: SCFModule.calc_Sdhm_array(NDT, sinh, SRHour.Sh, Grid.Nh, Steps=SunUp), Repeat)
+    Azwjdt = SCFModule.calc_Azwjdt_array(Azwj, Azsdt)
+    [Times["ax"], Ax] = calc_BenchTime(lambda: SCFModule.calc_Ax_array(WSSize, Azwjdt, hsdt), Repeat)
+
+    # Main X.1 と同じく、SunUp の時間分割だけを一括計算する
+    Awj = WSSize[1] * WSSize[8]
+    def calc_SunUpHours():
+        SCF01 = np.zeros((2, 8760, NDT))
+        SCF01.reshape(2, -1)[:, SunUp] = SCFModule.calc_SCF01_steps(SunUp, Grid, SRHour.Sh, Azwj, WSSize
+                                                                    , etakk, etaisr, Awj, gammayp, gammaym)
+        return SCF01
+    [Times["sunup_hours"], SCF01] = calc_BenchTime(calc_SunUpHours, Repeat)
+
+    [Times["aggregation"], SCF] = calc_BenchTime(
+        lambda: SCFModule.Output_ShadingCorrectionFactor(SRHour, NDT, SCF01, Grid), Repeat)
+
+    [Times["total"], SCF] = calc_BenchTime(
+        lambda: SCFMain.Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, 
+                                                     WSSize), Repeat)
+
+    return [{Stage: Times[Stage][0] for Stage in BenchStages}, {Stage: Times[Stage][1] for Stage in BenchStages}]
+        # [{段階名: 計算時間の中央値[s]}, {段階名: 計算時間の最小値[s]}]
+
+
+# ### Y.3 全ケースの計算時間
+#
+# - `\TestConfig01\AllTest01.csv`形式のケースリストの全ケースを`Calc_ShadingCorrectionFactor`で順に計算し、ケース毎の計算時間[s]を計る
+#   - `engine`は`Calc_ShadingCorrectionFactor`と同じ("numpy" か "numba")。numba は1ケース目の前にコンパイルしておく
+
+# In[3]:
+
+
+""" 全ケースの計算時間 """
+import Shading_Correction_Factor_Main as SCFMain
+import pandas as pd
+import time
+import sys
+
+def Bench_Cases(FileName00, engine="numpy"):
+    # FileName00 = "./TestConfig01/AllTest01.csv"   # ケースリスト
+
+    csv_input = pd.read_csv(filepath_or_buffer=FileName00, encoding="ms932", sep=",")
+    if not csv_input.columns[0].endswith("_case"):
+        sys.exit("ファイル内に貼り付けたテスト条件が違います")
+    Cases = [list(Case) for Case in csv_input.values]
+
+    if engine == "numba" and SCFModule.NumbaAvailable:
+        SCFModule.get_NumbaFunctions()
+
+    Times = {}
+    for Case in Cases:
+        Start = time.perf_counter()
+        SCFMain.calc_Case(Case, engine)
+        Times[str(Case[0])] = time.perf_counter() - Start
+
+    return {"total": sum(Times.values()), "per_case": Times}
+
+
+# ### Y.4 結果の保存と比較
+#
+# - ベンチマークの結果は、`{"meta": 環境, "stages": Y.2の中央値, "stages_min": Y.2の最小値, "cases": Y.3}`の形でJSONに保存する
+#   - `stages`, `stages_min`のキーは`"zone=地域区分,ndt=時間分割数"`
+# - `compare_BenchResult`は、保存済みの基準`Baseline`と比べて、計算時間が`(1 + Threshold)`倍を超えた項目を返す
+#   - 段階毎の時間は、今回の最小値(`stages_min`)と基準の中央値(`stages`)を比べる → 今回の`Repeat`回がすべて遅い場合だけ遅くなったとする
+#   - 他の処理との競合などで1回だけ遅くなった計測では、遅くなったと判定しない
+#   - コマンドラインから比較する場合は、遅くなった段階を`Repeat`回計り直し、最小値を更新して比較し直す
+#   - 基準と今回の時間がどちらも、同じキーの基準の`total`(1回分の計算時間)の`MinFraction`倍未満の段階は、計測のばらつきが大きいので比較しない
+#   - 時間分割数`NDT`が小さいと`total`自体が短いので、段階の時間の絶対値ではなく`total`に対する割合で足切りする → `total`は常に比較する
+#   - 共用の計算機では、同じプログラムでも最小値同士で3割程度ばらつくことがあるので、既定は`Threshold`$=0.5$, `MinFraction`$=0.05$ とする
+# - 実行例
+#   - `python Shading_Correction_Factor_Benchmark.py run --output ./SCFCalc01/bench.json`
+#   - `python Shading_Correction_Factor_Benchmark.py run --output ./SCFCalc01/bench_new.json --baseline ./SCFCalc01/bench.json --threshold 0.5`
+#   - 比較で遅くなった項目があれば、一覧を出力して終了コード1で終了する
+
+# In[4]:
+
+
+""" 結果の保存と比較 """
+import json
+import platform
+import datetime
+
+def get_BenchMeta():
+
+    return {"date": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__, "numba": SCFModule.NumbaAvailable,
+            "machine": platform.machine(), "platform": platform.platform()}
+
+
+def save_BenchResult(Result, FileName):
+
+    with open(FileName, "w", encoding="utf-8") as outputfile:
+        json.dump(Result, outputfile, ensure_ascii=False, indent=1)
+
+
+def load_BenchResult(FileName):
+
+    with open(FileName, encoding="utf-8") as inputfile:
+        return json.load(inputfile)
+
+
+def compare_BenchResult(Result, Baseline, Threshold=0.5, MinFraction=5e-2):
+
+    # [項目名, 基準の時間, 今回の時間, 比較しない時間] の組を集める
+    Pairs = []
+    for [Key, Times] in Result.get("stages_min", Result.get("stages", {})).items():
+        Times00 = Baseline.get("stages", {}).get(Key, {})
+        MinTime = MinFraction * Times00.get("total", Times.get("total", 0))
+        for [Stage, Time] in Times.items():
+            if Stage in Times00:
+                Pairs.append(["stages/{}/{}".format(Key, Stage), Times00[Stage], Time, 0 if Stage == "total" else MinTime])
+    if "cases" in Result and "cases" in Baseline:
+        Pairs.append(["cases/total", Baseline["cases"]["total"], Result["cases"]["total"], 0])
+
+    Regressions = [[Name, Time00, Time01] for [Name, Time00, Time01, MinTime] in Pairs
+                   if max(Time00, Time01) >= MinTime and Time01 > Time00 * (1 + Threshold)]
+
+    return Regressions
+        # [[項目名, 基準の時間[s], 今回の時間[s]], ...]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="一括計算のベンチマーク")
+    parser.add_argument("mode", choices=["timegrid", "run"], help="timegrid：Y.1のみ, run：Y.2, Y.3を計測して保存・比較")
+    parser.add_argument("--path", default="./SCFConfig01/", help="設定ファイルのあるパス")
+    parser.add_argument("--zone", type=int, nargs="+", default=list(range(1, 9)), help="地域区分")
+    parser.add_argument("--ndt", type=int, nargs="+", default=[1, 2, 6, 12, 60], help="1時間の分割数")
+    parser.add_argument("--repeat", type=int, default=7, help="各段階の繰り返し回数(中央値を使う)")
+    parser.add_argument("--cases", default="./TestConfig01/AllTest01.csv", help="ケースリスト(空文字で省略)")
+    parser.add_argument("--engine", choices=["numpy", "numba"], default="numpy", help="全ケースの計算エンジン")
+    parser.add_argument("--output", default=None, help="結果のJSONの保存先")
+    parser.add_argument("--baseline", default=None, help="比較する基準のJSON")
+    parser.add_argument("--threshold", type=float, default=0.5, help="遅くなったと判定する割合")
+    parser.add_argument("--min-fraction", type=float, default=5e-2, help="比較しない短い段階(totalに対する割合)")
+    args = parser.parse_args()
+
+    if args.mode == "timegrid":
+        for ClimateZone in args.zone:
+            [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] \
+                = SCFModule.input_Point(ClimateZone, args.path, "Zone.csv")
+            for NDT in args.ndt:
+                Result = Bench_TimeGrid(Latitude, Longitude, NDT)
+                print('zone = {}, NDT = {NDT}: sinh {NSinh_separate} -> {NSinh_grid}, '
+                      'time {Time_separate:.4f}s -> {Time_grid:.4f}s, match = {Match}'.format(ClimateZone, **Result))
+        sys.exit(0)
+
+    Result = {"meta": get_BenchMeta(), "stages": {}, "stages_min": {}}
+    for ClimateZone in args.zone:
+        for NDT in args.ndt:
+            Key = "zone={},ndt={}".format(ClimateZone, NDT)
+            [Result["stages"][Key], Result["stages_min"][Key]] \
+                = Bench_Stages(args.path, "Zone.csv", "IncidentAngleCharacteristics.csv", ClimateZone, NDT, args.repeat)
+            print(Key, " ".join("{}={:.4f}".format(Stage, Result["stages"][Key][Stage]) for Stage in BenchStages))
+    if args.cases:
+        Result["cases"] = Bench_Cases(args.cases, args.engine)
+        Result["cases"]["engine"] = args.engine
+        print("cases: {} cases, total = {:.2f}s".format(len(Result["cases"]["per_case"]), Result["cases"]["total"]))
+    if args.output:
+        save_BenchResult(Result, args.output)
+
+    if args.baseline:
+        Baseline = load_BenchResult(args.baseline)
+        Regressions = compare_BenchResult(Result, Baseline, args.threshold, args.min_fraction)
+        
+        """ 遅くなった段階は計り直し、最小値を更新して比較し直す(計測のばらつきによる誤判定を減らす) """
+        Keys = sorted(set(Name.split("/")[1] for [Name, Time00, Time01] in Regressions if Name.startswith("stages/")))
+        for Key in Keys:
+            [ClimateZone, NDT] = [int(x.split("=")[1]) for x in Key.split(",")]
+            Retry = Bench_Stages(args.path, "Zone.csv", "IncidentAngleCharacteristics.csv", ClimateZone, NDT, args.repeat)[1]
+            for Stage in BenchStages:
+                Result["stages_min"][Key][Stage] = min(Result["stages_min"][Key][Stage], Retry[Stage])
+        if Keys:
+            Regressions = compare_BenchResult(Result, Baseline, args.threshold, args.min_fraction)
+        for [Name, Time00, Time01] in Regressions:
+            print("遅くなった項目: {} {:.4f}s -> {:.4f}s".format(Name, Time00, Time01))
+        sys.exit(1 if Regressions else 0)
@@ -10,14 +10,32 @@
 # 
 
 # ### X.1 本体プログラム
+# 
+# - `engine="numpy"`(既定)の場合は、太陽が地平線上にある時間分割(Modules F.12 `SunUp`)だけを、時間分割を指定した一括計算(Modules F.10)で計算する
+#   - 太陽が地平線下の時間分割の分子分母は0のまま。Python の時間分割毎のループは行わない
+#   - 入射角特性は、窓面に直達日射が当たる時間分割だけを計算する(Modules F.10)
+# - `engine="numba"`の場合は、時間分割毎の計算を numba でコンパイルしたループ(Modules F.8)で行う
+#   - numba がインストールされていなければ、警告を出して NumPy 版で計算する
+# - `profile=True`の場合は、計算過程の記録(Modules F.9)を有効にして計算し、`[SCF, 記録]`を返す
+#   - 段階は`"D.1"`, `"D.2"`, `"A.8"`, `"C.3, C.5"`, `"D.5"`, `"1時間のループ【1回目】"`, `"1時間のループ【2回目】"`, `"E.3"`
+#   - 呼び出し回数`"Counts"`は`engine="numpy"`の場合だけ記録する。`engine="numba"`の場合は空の辞書`{}`
+#   - 複数窓の一括計算などでは、`with SCFModule.profiling() as Profile:`で囲めば同じ記録が取れる
+#   - `memory=True`の場合は、メモリ使用量のピークも`tracemalloc`で計る。計算が大幅に遅くなるので、段階毎の時間は`memory=False`の記録を使う
+# - `Period`を指定した場合は、その期間(暖冷房期間, 月)の時刻だけを計算する(Modules F.10, F.11)
+#   - 例：冷房期の値`SCF[2][-2][-1]`だけが必要なら`Period=["冷房期"]`
+#   - 指定した期間の行`SCF[h][i]`は1年分を計算した場合と同じ値、それ以外の行は0を返す
+#   - `engine="numpy"`の場合は期間内の時刻だけを一括計算する。`engine="numba"`の場合は1年分を numba で計算し、期間で確定しない行を0とする
 
 # In[3]:
 
 
 """ 日よけ効果係数計算プログラム本体 """
 import Shading_Correction_Factor_Modules as SCFModule
+import numpy as np
+import warnings
+import sys
 
-def Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, WSSize ):
+def Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, WSSize, DType=np.float64, engine="numpy", profile=False, Period=None, memory=False ):
 
     """ 引数(の例) """    
 #    Path00 = "./SCFConfig01/"  # 設定ファイルのあるパス
@@ -30,34 +48,54 @@ def Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, ND
 #    WSSize = [1.1, 2.1, 0.9, 1.05, 1.07, 0.88, 0.85, 0.98, 2.05, 1.02, 0.96, 0.92, 1.01, 0.97, 0.24, 0.28, 0.21, 0.2]
     # WSSize = [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym]
     # WSSize:窓および日よけの寸法一式
+#    DType = np.float64         # 時間分割毎の分子分母の配列の型, メモリを節約する場合は np.float32
+#    engine = "numpy"           # 時間分割毎の計算エンジン, "numpy" か "numba"(numbaがなければ "numpy" で計算)
+#    profile = False            # True の場合は計算過程を記録し、[SCF, 記録]を返す(Modules F.9)
+#    Period = None              # 計算する期間, ["冷房期"], [7, 8] など(Modules F.11), None なら1年分
+#    memory = False             # profile=True で、メモリ使用量のピークも記録する場合は True(計算は遅くなる)
+    
+    """ 計算過程の記録(F.9) → 記録を有効にして計算し直す """
+    if profile:
+        with SCFModule.profiling(Memory=memory) as Profile:
+            SCF = Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, WSSize
+                                               , DType, engine, Period=Period )
+        return [SCF, Profile.record()]
     
-    """ リストの初期設定 """    
-    Nh = [0 for i in range(8761)]
-    SCF01 = [[[0 for j in range(NDT)] for i in range(8761)] for h in range(2)]
+    if engine not in ["numpy", "numba"]:
+        sys.exit("計算エンジンの指定が不適切です")
+    if engine == "numba" and not SCFModule.NumbaAvailable:
+        warnings.warn("numba がインストールされていないため、NumPy 版で計算します")
+        engine = "numpy"
+    
+    """ 配列の初期設定 """    
+        # SCF01[h, Hour00, MM]:時間分割毎の(2)式の分子(h=0),分母(h=1), Hour00=0～8759
+    SCF01 = np.zeros((2, 8760, NDT), dtype=DType)
+    SCFModule.lap_Profile("初期設定")
     
     """ \Zone.csv から地点データの読み込み(D.1) """
         # Zone:地域区分, City:都市, Latitude:緯度, Longitude:経度, SRFileName:日射量ファイル名
         # HStart:暖房開始日, HEnd:暖房終了日, CStart:冷房開始日, CEnd:冷房終了日
     [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd]             = SCFModule.input_Point(ClimateZone, Path00, FileName00)
+    SCFModule.lap_Profile("D.1")
 
     """ 気象データ読み込み(D.2) """
-        # SRHour[i][j]：1時間間隔データ
-        #               i=0：1/1 0時 ～ 8760：12/31 24時
-        #               j=0：月日時刻の5桁or6桁表記, j=1：法線面直達日射量[kcal/(m2h)]
-        #               j=2：水平面天空日射量[kcal/(m2h)], j=3：暖房冷房判定タグ(暖房期:1, 冷房期:2, 非空調期:0)
-    SRHour = SCFModule.input_SRData(Path00, SRFileName, HStart, HEnd, CStart, CEnd)
+        # SRHour：1時間間隔データの列(SRData), 各列の[i]は i=0：1/1 0時 ～ 8760：12/31 24時
+        #         MMDDTT：月日時刻の5桁or6桁表記, Sdd：法線面直達日射量[kcal/(m2h)]
+        #         Ssd：水平面天空日射量[kcal/(m2h)], HCTag：暖房冷房判定タグ(暖房期:1, 冷房期:2, 非空調期:0)
+        #         Sh：[Sdd, Ssd]を並べた(8761, 2)の配列
+    SRHour = SCFModule.get_ZoneRegistry(Path00, FileName00).SRData(ClimateZone)     # 地点毎にキャッシュ(D.1)
+    SCFModule.lap_Profile("D.2")
     
     """ 窓面の方位(A.8) """
         # Azwj:窓面の方位(-180°< Azwj <= 180°)
     Azwj = SCFModule.calc_Azwj(Azimuth)
+    SCFModule.lap_Profile("A.8")
     
-    """ 天空日射の効果係数(C.3) """    
+    """ 天空日射の効果係数(C.3), 反射日射の効果係数(C.5) → 寸法毎にキャッシュ(F.7) """    
         # gammayp:天空日射の効果係数, 天空の形態係数の2倍
-    gammayp = SCFModule.calc_gammayp(WSSize)
-
-    """ 反射日射の効果係数(C.5) """    
         # gammaym:反射日射の効果係数, 地面の形態係数の2倍
-    gammaym = SCFModule.calc_gammaym(WSSize)
+    [gammayp, gammaym] = SCFModule.get_gammay(WSSize)
+    SCFModule.lap_Profile("C.3, C.5")
     
     """ 窓ガラスの入射角特性読み込み(D.5) """  
         # etamax:直達日射に対する入射角特性最大値(入射角0)
@@ -68,88 +106,384 @@ def Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, ND
     """ 窓面積算定 """  
         # Awj:窓面積[m2]
     Awj = WSSize[1] * WSSize[8]    # Awj = X2 * Y2
+    SCFModule.lap_Profile("D.5")
     
-    """ +++++++++++++++++++++++++++++++++++ 1時間のループ【1回目】→ Nhを通しで計算するためだけ ++++ """       
-    for Hour00 in range(8761):
-        """ 日時の計算(A.1)【1回目】 """
-            # Hour00:1年間の通しの時刻, 1/1 0時がHour00=0, 12/31 24時がHour00=8760
-            # NDay:1/1を"1", 12/31を"365"とする年頭からの通しの日数
-            # NHour:時刻(0時～23時),12/31のみ24時あり
-        [NDay,NHour] = SCFModule.calc_NDayNHour(Hour00)
-
-        """ 正時±30分で太陽が地平線上にある時間刻み数のカウント(D.3) """
-            # Nh[Hour00]:正時±30分で太陽が地平線上にある時間刻み数のカウント数
-            # NDT:1時間の分割数,ツールの標準は6分割
-        Nh[Hour00] = SCFModule.calc_Nh(Latitude, Longitude, NDay, NHour, NDT)
+    """ 正時±30分で太陽が地平線上にある時間刻み数のカウント, 1年分の太陽位置(D.3, A.2～A.7, F.1) """
+        # 地点毎にキャッシュした時間刻みの格子を参照(F.3, F.5)
+        # Grid.Nh[Hour00]:正時±30分で太陽が地平線上にある時間刻み数のカウント数, Hour00=0～8760
+        # Grid.sinh, Grid.cosh:太陽高度の正弦,余弦, Grid.hsdt:太陽高度[deg], Grid.Azsdt:太陽方位角[deg]
+    Grid = SCFModule.get_TimeGrid(Latitude, Longitude, NDT)
+    SCFModule.lap_Profile("1時間のループ【1回目】")       # ← 格子の参照(F.5)に置き換え済み
+    
+    """ 計算する期間の選択(F.11) → 期間内の時刻だけを計算, 期間で確定しない行は0とする """
+        # PeriodHours:期間内の時刻 Hour00 の配列, Rows:期間で値が確定する行 i のリスト
+    if Period is not None:
+        [PeriodHours, Rows] = SCFModule.calc_PeriodHours(SRHour, Period)
     
     """ ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ 1時間のループ【2回目】 ++++ """       
-    for Hour00 in range(8760):      # ← 12/31 24時は回さないのでHour00=8759がループの最後
-        """ 日時の計算(A.1)【2回目】 """
-        [NDay,NHour] = SCFModule.calc_NDayNHour(Hour00)    
-
-        """ 赤緯の計算(A.2) """
-            # delta_d:赤緯[deg]
-        deltad = SCFModule.calc_deltad(NDay)
-
-        """ 均時差の計算(A.3) """
-            # eed:均時差[hour]
-        eed = SCFModule.calc_eed(NDay)
-                
-        """ 「月」の計算(D.2) """
-        Month = SCFModule.calc_Month(SRHour.values[Hour00][0])
-            
-        """ +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ (1/NDT)時間のループ ++++ """ 
-            # MM:1時間の内の(1/NDT)間隔の順番, 正時がMM=0, MM=0～NDT-1
-        for MM in range(NDT):
-            """ 時刻TTの計算(A.1) """
-                # TT:時間分割MM毎の時刻[hour]
-            TT = SCFModule.calc_TT(NHour, NDT, MM)
-
-            """ 時角の計算(A.4) """
-                # Tdt:時角[deg]
-            Tdt = SCFModule.calc_Tdt(Longitude, eed, TT)
-
-            """ 太陽高度とその正弦,余弦の計算(A.5,A.6) """
-                # hsdt:太陽高度hsdt[deg], sinh:hsdtの正弦, cosh:hsdtの余弦
-            sinh = SCFModule.calc_sinh(Latitude, deltad, Tdt)
-            cosh = SCFModule.calc_cosh(sinh)
-            hsdt = SCFModule.calc_hsdt(cosh, sinh)
-            
-            """ 太陽方位角の計算(A.7) """
-                # Azsdt:太陽方位角[deg]
-            Azsdt = SCFModule.calc_Azsdt(Latitude, deltad, Tdt, sinh, cosh)
-            
-            """ 窓面の法線ベクトルと太陽位置とのなす水平面上の角度の計算(A.9) """
-                # Azwjdt:窓面の法線ベクトルと太陽位置とのなす水平面上の角度[deg]
-            Azwjdt = SCFModule.calc_Azwjdt(Azwj, Azsdt)
-            
-            """ (1/NDT)分割MM番目の法線面直達日射量, 水平面天空日射量(D.4) """
-                # Sddhm:(1/NDT)分割MM番目における法線面直達日射量[kcal/m2]
-                # Ssdhm:(1/NDT)分割MM番目における水平面天空日射量[kcal/m2]
-            Sddhm = SCFModule.calc_Sdhm(MM, NDT, sinh, SRHour.values[Hour00][1]
-                                      , SRHour.values[Hour00+1][1], Nh[Hour00], Nh[Hour00+1])
-            Ssdhm = SCFModule.calc_Sdhm(MM, NDT, sinh, SRHour.values[Hour00][2]
-                                      , SRHour.values[Hour00+1][2], Nh[Hour00], Nh[Hour00+1]) 
-            
-            """ 直達日射の入射角(D.6) """
-                # costheta:直達入射の窓面への入射角の余弦  
-            costheta = SCFModule.calc_costheta(Azwjdt, cosh)
-   
-            """ 直達日射に対する窓ガラスの入射角特性(D.6) """
-                # etajdt:日付NDay,時刻TTにおける入射角特性
-            etajdt = SCFModule.calc_etajdt(costheta, etakk)
-                        
-            """ 直達日射が窓に射す部分の面積の計算(B.7) """
-                # Ax:直達日射が窓に射す部分の面積[m2]
-            Ax = SCFModule.calc_Ax(WSSize, Azwjdt, hsdt)
-
-            """ 日よけ効果係数算定式の時刻TTにおける分子分母(E.2) """
-                # SCF00[0]:(2)式の分子への加算分(窓面積をかけた値として)     
-                # SCF00[1]:(2)式の分母への加算分(窓面積をかけた値として)
-            [SCF01[0][Hour00][MM],SCF01[1][Hour00][MM]]                 = SCFModule.calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh
-                                       , Awj, Ax, gammayp, gammaym)
+    if engine == "numba":
+        """ numba による時間分割毎の計算(F.8) → 1年分を計算 """
+        SCF01 = SCFModule.calc_SCF01_numba(Latitude, Longitude, NDT, Grid.Nh, SRHour.Sh, Azwj, WSSize
+                                           , etakk, etaisr, Awj, gammayp, gammaym, DType)
+    else:
+        """ 太陽が地平線上にある時間分割だけを一括計算(F.10, F.12) → それ以外の SCF01 は0のまま """
+            # SunUp:(8760, NDT)を1次元化した位置 Hour00 * NDT + MM の配列, Period を指定した場合は期間内の時刻に限る
+        SunUp = SCFModule.get_SunIndex(Latitude, Longitude, NDT)
+        if Period is not None:
+            SunUp = SunUp[np.isin(SunUp // NDT, PeriodHours)]
+        SCF01.reshape(2, -1)[:, SunUp] = SCFModule.calc_SCF01_steps(SunUp, Grid, SRHour.Sh, Azwj, WSSize
+                                                                    , etakk, etaisr, Awj, gammayp, gammaym)
+    SCFModule.lap_Profile("1時間のループ【2回目】")       # ← 一括計算(F.8 か F.10)に置き換え済み
          
-    SCF = SCFModule.Output_ShadingCorrectionFactor(SRHour, NDT, SCF01)
+    SCF = SCFModule.Output_ShadingCorrectionFactor(SRHour, NDT, SCF01, Grid)
+    if Period is not None:
+        SCF = SCFModule.select_PeriodRows(SCF, Rows)
+    SCFModule.lap_Profile("E.3")
+    
+    return SCF
+
+
+
+# ### X.2 複数窓の一括計算
+# 
+# - 同じ地域区分`ClimateZone`, 時間分割数`NDT`, 入射角特性`etaID`の窓`N`個を一度に計算する
+#   - `WSSizes`：窓および日よけの寸法一式`WSSize`を行とする`(N, 18)`の配列
+#   - `Azimuths`：各行の窓面の方位(16方位か角度)のリスト
+# - 地点データ, 気象データ, 入射角特性の読み込みと、太陽が地平線上にある時間分割`SunUp`の索引(Modules F.12)は1回だけ求め(`calc_ZoneData`)、`SunUp`の時間分割だけを窓の軸`N`を持たせた配列で一括計算する(`calc_SCF_windows`, Modules F.10)
+#   - `SunUp`は窓の寸法・方位によらないので、全窓で同じ時間分割を計算する。太陽が地平線下の時間分割の分子分母は0
+#   - 太陽位置, 日射量は窓によらないので、窓の軸を持たない配列として1回だけ計算する
+# - 戻り値は、各窓の`SCF[h][i][j]`を積み重ねた`(N, 3, 15, 26)`の配列
+#   - `SCF[n][h][i][j]`の`i`, `j`は`Calc_ShadingCorrectionFactor`の戻り値と同じく負のインデックスで参照できる
+# - `MemoryBudget`[byte]を指定した場合は、時間を月毎に、窓をメモリ使用量が`MemoryBudget`程度に収まる数毎に区切って計算する(Modules F.14)
+#   - 結果は区切り方によらず、区切らない場合と一致する。X.3 の全方位一括計算, 入射角特性の一括計算でも指定できる
+
+# In[4]:
+
+
+""" 日よけ効果係数計算プログラム 複数窓の一括計算 """
+import numpy as np
+import sys
+
+def calc_ZoneData(Path00, FileName00, FileName01, ClimateZone, NDT, etaID):
+    # 窓の寸法・方位によらないデータの読み込みと計算
+    
+    """ \Zone.csv から地点データの読み込み(D.1) """
+    [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] \
+        = SCFModule.input_Point(ClimateZone, Path00, FileName00)
+
+    """ 気象データ読み込み(D.2) """
+    SRHour = SCFModule.get_ZoneRegistry(Path00, FileName00).SRData(ClimateZone)     # 地点毎にキャッシュ(D.1)
+    
+    """ 窓ガラスの入射角特性読み込み(D.5) """  
+        # etaID がリストの場合は、入射角特性毎の値を(K, 1, 1)の形にする
+    if np.ndim(etaID) == 0:
+        [etaID0, etamax, etaisr, etakk] = SCFModule.input_IncidentAngleCharacteristics(etaID, Path00, FileName01)    
+    else:
+        [etaID0, etamax, etaisr, etakk] = SCFModule.input_IncidentAngleCharacteristicsList(etaID, Path00, FileName01)
+        [etaisr, etakk] = [etaisr[:, None, None], list(etakk.T[:, :, None, None])]
+    
+    """ 正時±30分で太陽が地平線上にある時間刻み数のカウント, 1年分の太陽位置(D.3, A.2～A.7, F.1, F.3, F.5) """
+    Grid = SCFModule.get_TimeGrid(Latitude, Longitude, NDT)
+    
+    """ 太陽が地平線上にある時間分割(F.12) """
+        # SunUp:(8760, NDT)を1次元化した位置 Hour00 * NDT + MM の配列
+    SunUp = SCFModule.get_SunIndex(Latitude, Longitude, NDT)
+    
+    return [SRHour, Grid, SunUp, etaisr, etakk]
+        # ZoneData として calc_SCF_windows に渡す
+
+
+def calc_SCF_windows(ZoneData, NDT, Azwj, WSSize, Awj, gammayp, gammaym, DType=np.float64, MemoryBudget=None):
+    # 窓の軸Nを先頭に持たせて一括計算
+    # Azwj, WSSize の各要素, Awj, gammayp, gammaym は、スカラーか(N, 1, 1)の形の配列として
+    # 時間分割毎の配列とブロードキャストする
+    # ZoneData の etaisr, etakk が(K, 1, 1)の形の場合は、入射角特性の軸Kとする(窓は1個)
+    # MemoryBudget[byte] を指定した場合は、時間と窓を区切って計算する(F.14)
+    
+    [SRHour, Grid, SunUp, etaisr, etakk] = ZoneData
+    if MemoryBudget is not None:
+        return SCFModule.calc_SCF_tiles(Grid, SRHour, Azwj, WSSize, Awj, gammayp, gammaym, etaisr, etakk
+                                        , MemoryBudget, DType)
+    
+    """ 太陽が地平線上にある時間分割だけの分子分母(F.10, F.12) """
+        # SCF00[h, n, s]:SunUp の s 番目の時間分割の分子(h=0),分母(h=1)
+    SCF00 = SCFModule.calc_SCF01_steps(SunUp, Grid, SRHour.Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym)
+    SCF00 = SCF00.reshape(2, -1, len(SunUp))
+    
+    """ 期間積算処理 → 日よけ効果係数算出(E.3) """
+        # SCF01[n, h, s], h = 0：分子, h = 1：分母 → SunUp の外は0なので積算しない
+        # 積算先のインデックスは全窓で1回だけ求める
+    SCF01 = SCF00.transpose(1, 0, 2).astype(DType)
+    SCF = SCFModule.Output_ShadingCorrectionFactor_array(SRHour, NDT, SCF01, Grid, SunUp)
+    
+    return SCF
+
+
+def Calc_ShadingCorrectionFactor_batch(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuths, WSSizes, DType=np.float64, MemoryBudget=None ):
+
+    """ 引数(の例) """    
+#    Azimuths = ["南", "東", -30.0]     # 各窓の窓面の方位
+#    WSSizes = [[1.1, 2.1, 0.9, 1.05, 1.07, 0.88, 0.85, 0.98, 2.05, 1.02, 0.96, 0.92, 1.01, 0.97, 0.24, 0.28, 0.21, 0.2],
+#               [0.2, 2, 0.2, 0.2, 0.2, 0.2, 0.2, 0.2, 2, 0.2, 0.2, 0.2, 0.2, 0.2, 0, 0, 1, 0],
+#               [999, 1, 999, 999, 999, 999, 999, 0.5, 2.1, 0, 0.5, 0.5, 0, 0, 0, 0, 2, 0]]
+#    MemoryBudget = None                # 区切って計算する場合のメモリ使用量の目安[byte], 例：2**28
+    # その他の引数は Calc_ShadingCorrectionFactor と同じ
+    
+    WSSizes = np.asarray(WSSizes, dtype=float)
+    if WSSizes.ndim != 2 or WSSizes.shape[1] != 18 or len(Azimuths) != len(WSSizes):
+        sys.exit("窓および日よけの寸法と窓面の方位の入力が不適切です")
+    
+    """ 窓によらないデータの読み込みと計算(D.1～D.5) """
+    ZoneData = calc_ZoneData(Path00, FileName00, FileName01, ClimateZone, NDT, etaID)
+    
+    """ 以下、窓毎の値は(N, 1, 1)の形にする """
+    
+    """ 窓面の方位(A.8) """
+    Azwj = np.array([SCFModule.calc_Azwj(Azimuth) for Azimuth in Azimuths])[:, None, None]
+    
+    """ 天空日射の効果係数(C.3), 反射日射の効果係数(C.5) → 全窓を一括計算(F.7) """    
+    gammayp = SCFModule.calc_gammayp_array(WSSizes)[:, None, None]
+    gammaym = SCFModule.calc_gammaym_array(WSSizes)[:, None, None]
+    
+    """ 窓面積算定 """  
+    Awj = (WSSizes[:, 1] * WSSizes[:, 8])[:, None, None]    # Awj = X2 * Y2
+    
+    SCF = calc_SCF_windows(ZoneData, NDT, Azwj, list(WSSizes.T[:, :, None, None]), Awj, gammayp, gammaym, DType
+                           , MemoryBudget)
+    
+    return SCF
+
+
+# ### X.3 全方位一括計算, 入射角特性の一括計算
+# 
+# - 同じ窓および日よけ`WSSize`について、複数の窓面の方位`Azimuths`の日よけ効果係数を一度に計算する
+#   - 16方位すべては`SCFModule.Azimuth16`, 5°刻みは`range(-175, 181, 5)`のように与える
+# - 気象データ, 日射量, 天空・反射日射の効果係数は方位によらないので1回だけ計算し、方位毎には`Azwjdt`, `costheta`, `etajdt`, `Ax`だけを計算する
+# - 戻り値は、各方位の`SCF[h][i][j]`を積み重ねた`(len(Azimuths), 3, 15, 26)`の配列
+# - `Calc_ShadingCorrectionFactor_glazing`は、同じ窓および日よけ・方位について、複数の入射角特性`etaIDs`の日よけ効果係数を一度に計算する
+#   - 直達日射の面積等の幾何計算は1回だけ行い、入射角特性`etajdt`, `etaisr`だけを入射角特性毎に計算する
+#   - 戻り値は、各入射角特性の`SCF[h][i][j]`を積み重ねた`(len(etaIDs), 3, 15, 26)`の配列
+
+# In[5]:
+
+
+""" 日よけ効果係数計算プログラム 全方位一括計算 """
+import numpy as np
+
+def Calc_ShadingCorrectionFactor_sweep(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuths, WSSize, DType=np.float64, MemoryBudget=None ):
+
+    """ 引数(の例) """    
+#    Azimuths = SCFModule.Azimuth16     # 窓面の方位のリスト(16方位か角度)
+    # その他の引数は Calc_ShadingCorrectionFactor と同じ
+    
+    """ 窓によらないデータの読み込みと計算(D.1～D.5) """
+    ZoneData = calc_ZoneData(Path00, FileName00, FileName01, ClimateZone, NDT, etaID)
+    
+    """ 窓面の方位(A.8) → 方位毎の値は(len(Azimuths), 1, 1)の形にする """
+    Azwj = np.array([SCFModule.calc_Azwj(Azimuth) for Azimuth in Azimuths])[:, None, None]
+    
+    """ 天空日射の効果係数(C.3), 反射日射の効果係数(C.5), 窓面積 → 方位によらない """    
+    [gammayp, gammaym] = SCFModule.get_gammay(WSSize)
+    Awj = WSSize[1] * WSSize[8]    # Awj = X2 * Y2
+    
+    SCF = calc_SCF_windows(ZoneData, NDT, Azwj, list(WSSize), Awj, gammayp, gammaym, DType, MemoryBudget)
+    
+    return SCF
+
+
+def Calc_ShadingCorrectionFactor_glazing(Path00, FileName00, FileName01, ClimateZone, NDT, etaIDs, Azimuth, WSSize, DType=np.float64, MemoryBudget=None ):
+
+    """ 引数(の例) """    
+#    etaIDs = [0, 1]     # 入射角特性のIDのリスト
+    # その他の引数は Calc_ShadingCorrectionFactor と同じ
+    
+    """ 窓によらないデータの読み込みと計算(D.1～D.5) → 入射角特性は(len(etaIDs), 1, 1)の形 """
+    ZoneData = calc_ZoneData(Path00, FileName00, FileName01, ClimateZone, NDT, list(etaIDs))
+    
+    """ 窓面の方位(A.8), 天空日射の効果係数(C.3), 反射日射の効果係数(C.5), 窓面積 """
+    Azwj = SCFModule.calc_Azwj(Azimuth)
+    [gammayp, gammaym] = SCFModule.get_gammay(WSSize)
+    Awj = WSSize[1] * WSSize[8]    # Awj = X2 * Y2
+    
+    SCF = calc_SCF_windows(ZoneData, NDT, np.array(Azwj)[None, None, None], list(WSSize), Awj, gammayp, gammaym, DType
+                           , MemoryBudget)
+    
+    return SCF
+
+
+# ### X.4 ケースリストの並列計算
+# 
+# - `\TestConfig01\AllTest01.csv` 形式のケースリスト(1行1ケース)を読み込み、各ケースを`Calc_ShadingCorrectionFactor`で計算する
+#   - 1行目はヘッダ：`**_case`, Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, X1～Zym, 暖房期, 冷房期
+# - ケースは`concurrent.futures.ProcessPoolExecutor`で`MaxWorkers`個のプロセスに分配する(`None`ならCPU数)
+# - 結果はケースの順に集めて、最後にまとめて`FileName01`に追記する
+#   - 書式は、ケース毎に`SCF[h]`$(h=0～2)$の`[[SCF[h][i][j] for j in range(-1,25)] for i in range(-2,13)]`を1行ずつ(分子, 分母, 効果係数の3行)
+#   - Calculation.ipynb X.3.1 は3行とも`SCF[0]`(分子)を書いていた。`Run_CaseList`の2行目, 3行目はそれと異なり、分母`SCF[1]`, 効果係数`SCF[2]`になる
+#   - 値は`float`に直して書く(`numpy.float64`の表記にならないように)
+# - コマンドラインからも実行できる(X.6)
+#   - `python Shading_Correction_Factor_Main.py ./TestConfig01/AllTest01.csv ./SCFCalc01/AllTest01.csv --workers 4`
+#   - `--engine numba`で、時間分割毎の計算を numba(Modules F.8)で行う
+# - `Store`(フォルダ)を指定した場合は、テキストの代わりに列形式のストア(Modules F.13)に`ChunkCases`ケースずつ追記する
+#   - `python Shading_Correction_Factor_Main.py ./TestConfig01/AllTest01.csv --store ./SCFCalc01/AllTest01`
+#   - 読み込みは`SCFModule.input_SCFStore("./SCFCalc01/AllTest01", Case=...)`など
+
+# In[6]:
+
+
+""" ケースリストの並列計算 """
+import concurrent.futures
+import pandas as pd
+import sys
+
+def calc_Case(Case, engine="numpy"):
+    # Case:ケースリストの1行
+    
+    [case, Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth] = Case[0:8]
+    WSSize = list(Case[8:-2])
+    SCF = Calc_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, WSSize
+                                       , engine=engine )
     
     return SCF
 
+
+def Run_CaseList(FileName00, FileName01, MaxWorkers=None, engine="numpy", Store=None, ChunkCases=1000):
+    # FileName00 = "./TestConfig01/AllTest01.csv"   # ケースリスト
+    # FileName01 = "./SCFCalc01/AllTest01.csv"      # 計算結果の出力先(追記), Store を指定する場合は None でもよい
+    # engine = "numpy"                              # 時間分割毎の計算エンジン("numpy" か "numba")
+    # Store = None                                  # 列形式のストアのフォルダ(Modules F.13)
+    # ChunkCases = 1000                             # ストアに1回で追記するケース数
+    
+    csv_input = pd.read_csv(filepath_or_buffer=FileName00, encoding="ms932", sep=",")
+    if not csv_input.columns[0].endswith("_case"):
+        sys.exit("ファイル内に貼り付けたテスト条件が違います")
+    Cases = [list(Case) for Case in csv_input.values]
+    
+    """ 各ケースをプロセスに分配 → ケースの順に結果を回収 """
+        # ストアには ChunkCases ケース毎に追記
+    SCFs = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=MaxWorkers) as executor:
+        for SCF in executor.map(calc_Case, Cases, [engine] * len(Cases)):
+            SCFs.append(SCF)
+            if Store is not None and (len(SCFs) % ChunkCases == 0 or len(SCFs) == len(Cases)):
+                Start = (len(SCFs) - 1) // ChunkCases * ChunkCases
+                SCFModule.Output_SCFStore(Store, Cases[Start:len(SCFs)], SCFs[Start:])
+    if Store is not None:
+        return [[Case[0] for Case in Cases], SCFs]
+    
+    """ 計算結果をまとめて追記 """
+    Lines = []
+    for SCF in SCFs:
+        for h in range(0,3,1):
+            Lines.append(str([[float(SCF[h][i][j]) for j in range(-1,25,1)] for i in range(-2,13)]) + "\n")
+    with open(FileName01, "a") as outputfile:
+        outputfile.write("".join(Lines))
+    
+    return [[Case[0] for Case in Cases], SCFs]
+        # [ケース番号のリスト, 各ケースのSCF[h][i][j]のリスト]
+
+
+# ### X.5 1時間毎の逐次計算(ジェネレータ)
+# 
+# - `Iter_ShadingCorrectionFactor`は、1年分の`SCF01`を持たずに、時刻`Hour00`$=0～8759$の順に1時間毎の値を返すジェネレータ
+#   - 建物のエネルギー計算の時間ループに、日よけ効果係数を1時間ずつ渡す場合に使う
+#   - `BlockHours`時間(既定は24時間)毎に時間分割毎の分子分母をまとめて計算し(Modules F.10)、1時間ずつ返す → メモリ使用量は`BlockHours`で決まる
+#   - 返す値は`[Hour00, Month, HCTag, SCF01h]`, `Hourly=True`の場合は`[Hour00, Month, HCTag, SCF01h, SCFh]`
+#     - `Month`：月, `HCTag`：暖房冷房判定タグ(暖房期:1, 冷房期:2, 非空調期:0)
+#     - `SCF01h[h][MM]`：時間分割毎の(2)式の分子(`h`$=0$),分母(`h`$=1$)の`(2, NDT)`の配列
+#     - `SCFh`：時刻`Hour00`の行(時刻`NHour`$～$`NHour`$+1$)の分子, 分母それぞれの和の比。分母が0の場合は0
+# - `Fold_ShadingCorrectionFactor`は、ジェネレータの値を順に積算して`Calc_ShadingCorrectionFactor`と同じ`SCF[h][i][j]`を返す
+#   - 積算先と加算の順序は`Output_ShadingCorrectionFactor`(E.3)と同じ。各時刻の列は前時刻の`MM`$=$`NDT`$/2$からの積算になる
+#   - 時間分割毎の分子分母の計算は配列版(X.2と同じ)なので、`Calc_ShadingCorrectionFactor`とは丸め誤差程度の差がありうる
+
+# In[7]:
+
+
+""" 日よけ効果係数計算プログラム 1時間毎の逐次計算 """
+import numpy as np
+
+def Iter_ShadingCorrectionFactor(Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, WSSize, Hourly=False, BlockHours=24 ):
+
+    """ 引数(の例) """    
+#    Hourly = False             # True の場合は時刻毎の日よけ効果係数 SCFh も返す
+#    BlockHours = 24            # まとめて計算する時間数
+    # その他の引数は Calc_ShadingCorrectionFactor と同じ
+    
+    """ 地点データ, 気象データの読み込み(D.1, D.2) """
+    [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] \
+        = SCFModule.input_Point(ClimateZone, Path00, FileName00)
+    SRHour = SCFModule.get_ZoneRegistry(Path00, FileName00).SRData(ClimateZone)     # 地点毎にキャッシュ(D.1)
+    
+    """ 窓面の方位(A.8), 天空日射の効果係数(C.3), 反射日射の効果係数(C.5), 入射角特性(D.5), 窓面積 """
+    Azwj = SCFModule.calc_Azwj(Azimuth)
+    [gammayp, gammaym] = SCFModule.get_gammay(WSSize)
+    [etaID0, etamax, etaisr, etakk] = SCFModule.input_IncidentAngleCharacteristics(etaID, Path00, FileName01)    
+    Awj = WSSize[1] * WSSize[8]    # Awj = X2 * Y2
+    
+    """ 正時±30分で太陽が地平線上にある時間刻み数のカウント, 1年分の太陽位置(D.3, F.3, F.5) """
+    Grid = SCFModule.get_TimeGrid(Latitude, Longitude, NDT)
+    
+    """ 月(D.2), 暖房冷房判定タグ """
+    Month = SCFModule.calc_Month(SRHour.MMDDTT[0:8760])
+    HCTag = SRHour.HCTag[0:8760]
+    
+    """ ++++++++++++++++++++++++++++++++++++++++++++++++++++ BlockHours 時間毎の計算 → 1時間毎に返す ++++ """
+    for Start in range(0, 8760, BlockHours):
+        Hours = np.arange(Start, min(Start + BlockHours, 8760))
+        SCF01 = SCFModule.calc_SCF01_hours(Hours, Grid, SRHour.Sh, Azwj, WSSize
+                                           , etakk, etaisr, Awj, gammayp, gammaym)
+        for [n, Hour00] in enumerate(Hours):
+            Hour = [int(Hour00), int(Month[Hour00]), int(HCTag[Hour00]), SCF01[:, n]]
+            if Hourly:
+                [Num, Den] = SCF01[:, n].sum(axis=1)
+                Hour.append(Num / Den if Den != 0 else 0.0)
+            yield Hour
+
+
+def Fold_ShadingCorrectionFactor(Stream):
+    # Stream:Iter_ShadingCorrectionFactor の返す値(の列)
+    
+    SCF = np.zeros((3, 15, 26))
+        # SCF[h][i][j], h, i, j は Output_ShadingCorrectionFactor と同じ
+    
+    """ 分子分母の期間,月,時間毎の積算(E.3) → 1時間ずつ加算 """
+    for Hour in Stream:
+        [Hour00, Month, HCTag, SCF01h] = Hour[0:4]
+        NDT = SCF01h.shape[1]
+        Hour01 = (Hour00 % 24 + np.arange(NDT) / float(NDT) + 0.5).astype(int)      # calc_Hour01 と同じ
+        for i in [-HCTag % 15, Month]:
+            Rows = np.full(NDT, i)
+            for h in range(0, 2):
+                np.add.at(SCF[h], (Rows, Hour01), SCF01h[h])        # 各時刻
+                np.add.at(SCF[h], (Rows, np.full(NDT, 25)), SCF01h[h])    # 日積算
+    
+    """ 期間,月,時間毎の日よけ効果係数算出(E.1) """
+    np.divide(SCF[0], SCF[1], out=SCF[2], where=(SCF[1] != 0))
+    
+    return SCF.tolist()
+
+
+# ### X.6 コマンドラインからの実行
+# 
+# - ケースリストの並列計算(X.4)をコマンドラインから実行する。`import`した場合, ノートブック(Main.ipynb)で実行した場合は実行しない
+#   - X.5 までの関数をすべて定義した後に実行されるよう、ファイルの最後に置く
+
+# In[8]:
+
+
+if __name__ == "__main__" and "get_ipython" not in globals():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="ケースリストの日よけ効果係数を並列計算する")
+    parser.add_argument("FileName00", help="ケースリスト(例：./TestConfig01/AllTest01.csv)")
+    parser.add_argument("FileName01", nargs="?", default=None, help="計算結果の出力先(例：./SCFCalc01/AllTest01.csv)")
+    parser.add_argument("--workers", type=int, default=None, help="プロセス数(省略時はCPU数)")
+    parser.add_argument("--engine", choices=["numpy", "numba"], default="numpy", help="時間分割毎の計算エンジン")
+    parser.add_argument("--store", default=None, help="列形式のストアに追記する場合のフォルダ(例：./SCFCalc01/AllTest01)")
+    parser.add_argument("--chunk", type=int, default=1000, help="ストアに1回で追記するケース数")
+    args = parser.parse_args()
+    if args.FileName01 is None and args.store is None:
+        parser.error("計算結果の出力先(FileName01 か --store)を指定してください")
+    
+    [CaseNos, SCFs] = Run_CaseList(args.FileName00, args.FileName01, args.workers, args.engine, args.store, args.chunk)
+    for [case, SCF] in zip(CaseNos, SCFs):
+        print('case = {}: SCFh = {}, SCFc = {}'.format( case, SCF[2][-1][-1], SCF[2][-2][-1] ))
@@ -221,12 +221,13 @@ def calc_Azsdt(Latitude, deltad, Tdt, sinh, cosh):
 """ 窓面の方位 (仕様書5.2 図4) """
 import sys
 
+Azimuth16 = ["北北東", "北東", "東北東", "東", "東南東", "南東", "南南東", "南"
+             , "南南西", "南西", "西南西", "西", "西北西", "北西", "北北西", "北" ]
+
 def calc_Azwj(Azimuth):
     
-    Azimuth00 = ["北北東", "北東", "東北東", "東", "東南東", "南東", "南南東", "南"
-                 , "南南西", "南西", "西南西", "西", "西北西", "北西", "北北西", "北" ]
-    if Azimuth in Azimuth00:
-        Azwj = (Azimuth00.index(Azimuth) - 7) * 22.5
+    if Azimuth in Azimuth16:
+        Azwj = (Azimuth16.index(Azimuth) - 7) * 22.5
     elif -180 < float(Azimuth) <= 180:
         Azwj = float(Azimuth) 
     else:
@@ -951,6 +952,12 @@ def calc_gammaym(WSSize):
 #       - 気象データの「暖房$1$冷房$2$」の設定は上書き処理される → `\Zone.csv` の設定が優先
 # 
 # 
+# - `\Zone.csv`は、プロセス内で1回だけ読み込んで地点データの台帳`ZoneRegistry`にする(`get_ZoneRegistry`でキャッシュ)
+#   - 地域区分, 都市の辞書`ByID`, `ByCity`から行を引く。`input_Point`は台帳を引くだけで、呼び出し毎にCSVを読み込まない
+#   - 地域区分と都市の両方に一致する行がある場合は、従来どおり後の行を使う
+#   - 地域区分, 都市の重複は、読み込み時に`warnings.warn`で知らせる(従来は黙って後の行を使っていた)
+#   - 気象データ(D.2)は`ZoneRegistry.SRData(ClimateZone)`で、地点毎に最初に参照したときに読み込んでキャッシュする(配列は書き込み不可)
+#   - ファイルを書き換えた場合は`get_ZoneRegistry.cache_clear()`で破棄する
 # 
 
 # In[23]:
@@ -960,22 +967,66 @@ def calc_gammaym(WSSize):
 # \地域区分+日射量データ窓面入射角特性.xlsx "地域区分"シート
 #   → \SCFConfig01 下の地点データファイル \Zone.csv を作成 → 読み込み
 import pandas as pd
+import functools
+import warnings
 import sys
 
+class ZoneRegistry:
+    
+    def __init__(self, Path00, FileName00):
+        
+        csv_input = pd.read_csv(filepath_or_buffer=Path00+FileName00, encoding="ms932", sep=",")
+        if csv_input.columns[0]!="地域区分":
+            sys.exit("地点データではありません")
+        self.Path00 = Path00
+        self.Rows = [list(Row) for Row in csv_input.values]
+            # Rows[i] = [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd]
+        
+        """ 地域区分, 都市の索引 → 重複があれば後の行, 読み込み時に知らせる """
+        [self.ByID, self.ByCity] = [{}, {}]
+        for [i, Row] in enumerate(self.Rows):
+            for [Index, Key, Name] in [[self.ByID, Row[0], "地域区分"], [self.ByCity, Row[1], "都市"]]:
+                if Key in Index:
+                    warnings.warn("{}：{} {} が重複しています({}行目と{}行目, 後の行を使います)".format(
+                        FileName00, Name, Key, Index[Key] + 2, i + 2))
+                Index[Key] = i
+        self.SRHours = {}
+    
+    def Row(self, ClimateZone):
+        # 地域区分か都市に一致する行の番号, 両方に一致すれば後の行
+        Matches = [Index[ClimateZone] for Index in [self.ByID, self.ByCity] if ClimateZone in Index]
+        if len(Matches) == 0:
+            sys.exit("地点データがありません")
+        return max(Matches)
+    
+    def Point(self, ClimateZone):
+        
+        return list(self.Rows[self.Row(ClimateZone)])
+    
+    def SRData(self, ClimateZone):
+        # 気象データ(D.2)は地点毎に最初に参照したときに読み込む
+        i = self.Row(ClimateZone)
+        if i not in self.SRHours:
+            [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] = self.Rows[i]
+            SRHour = input_SRData(self.Path00, SRFileName, HStart, HEnd, CStart, CEnd)
+            for x in [SRHour.MMDDTT, SRHour.Sh, SRHour.Sdd, SRHour.Ssd, SRHour.HCTag]:
+                x.setflags(write=False)
+            self.SRHours[i] = SRHour
+        return self.SRHours[i]
+
+
+@functools.lru_cache(maxsize=None)
+def get_ZoneRegistry(Path00, FileName00):
+    
+    return ZoneRegistry(Path00, FileName00)
+
+
 def input_Point(ClimateZone, Path00, FileName00):
     # Path00 = "./SCFConfig01/"
     # FileName00 = "Zone.csv"
 
-    csv_input = pd.read_csv(filepath_or_buffer=Path00+FileName00, encoding="ms932", sep=",")
-    if csv_input.columns[0]!="地域区分":
-        sys.exit("地点データではありません")
-    [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd]         = ["None", "None", 0, 0, "None", 0, 0, 0, 0]
-    for i in range(len(csv_input)):
-        if ClimateZone == csv_input.values[i][0] or ClimateZone == csv_input.values[i][1]:
-            [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] = csv_input.values[i]            
-
-    if Zone=="None":
-        sys.exit("地点データがありません")
+    [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd] \
+        = get_ZoneRegistry(Path00, FileName00).Point(ClimateZone)
         
     return [Zone, City, Latitude, Longitude, SRFileName, HStart, HEnd, CStart, CEnd]
         # ここで返るSRFileNameはファイル名のみ
@@ -998,6 +1049,18 @@ def input_Point(ClimateZone, Path00, FileName00):
 #     - 気象データファイル中の「暖房$1$冷房$2$」の設定は、`\Zone.csv` の設定で上書きされる → 現時点で意味なし
 #     - $1$列目の日時から「月」を算出
 # 
+# 
+# - 読み込んだ$1～3$列目(日時, 法線面直達日射量, 水平面天空日射量)は、`.npy`形式のキャッシュとしてCSVと同じフォルダに保存する
+#   - ファイル名は`\SRforSCF_**.csv.cache-(更新時刻)-(サイズ).npy`。CSVの更新時刻かサイズが変わると作り直し、古いキャッシュは削除する
+#   - 2回目以降(別プロセスを含む)は、CSVを解析せずにキャッシュを`mmap_mode='r'`で読み込む
+#   - フォルダに書き込めない場合はキャッシュせずにCSVを読み込む。`UseCache=False`でもキャッシュを使わない
+# 
+# 
+# - `input_SRData`は、列毎に型を決めたNumPy配列を持つ`SRData`を返す(`SRHour`)
+#   - `MMDDTT`：日時(int32), `Sdd`：法線面直達日射量(float64), `Ssd`：水平面天空日射量(float64), `HCTag`：暖房冷房判定タグ(int8)
+#   - `Sh`：`[Sdd, Ssd]`を並べた`(8761, 2)`の配列(F.6, F.8, F.10 の`Sh`)。`Sdd`, `Ssd`はその列(コピーではない)
+#   - 時間分割毎のループの中で`DataFrame.values`から配列を作り直さないよう、各列を直接参照する
+#   - 従来の`SRHour.values[i][j]`の形は`values`で`(8761, 4)`の配列として取り出せる(呼ぶたびに作る)
 
 # In[24]:
 
@@ -1006,39 +1069,117 @@ def input_Point(ClimateZone, Path00, FileName00):
 # \地域区分+日射量データ窓面入射角特性.xlsx "SRforSCF_**.csv"シート 
 #   → \SCFConfig01 下の地点データファイル \SRforSCF_**.csv を作成 → 読み込み
 import pandas as pd
+import numpy as np
+import glob
+import os
 import sys
+import tempfile
 
-def input_SRData(Path00, FileName00, HStart, HEnd, CStart, CEnd):
+def input_SRCache(Path00, FileName00):
     # Path00 = "./SCFConfig01/"
     # FileName00 = "SRforSCF_**.csv"
-
-    csv_input = pd.read_csv(filepath_or_buffer=Path00+FileName00, encoding="ms932", sep=",")
+    
+    FilePath = Path00 + FileName00
+    Stat = os.stat(FilePath)
+    CachePath = "{}.cache-{}-{}.npy".format(FilePath, Stat.st_mtime_ns, Stat.st_size)
+    if os.path.exists(CachePath):
+        try:
+            return np.load(CachePath, mmap_mode="r")
+        except (OSError, ValueError):
+            pass            # 読めなければCSVから読み込み直す
+
+    csv_input = pd.read_csv(filepath_or_buffer=FilePath, encoding="ms932", sep=",")
     if csv_input.columns[0]!=FileName00[-len(csv_input.columns[0]):]:
         sys.exit("データが違います")
+    SRValues = np.ascontiguousarray(csv_input.values[:, 0:3])
+    
+    """ 古いキャッシュを削除して保存 → 一時ファイルに書いてから置き換える(並列実行対策) """
+        # 他のプロセスが書いたばかりの現在のキャッシュ CachePath は削除しない
+    for OldCachePath in glob.glob(glob.escape(FilePath) + ".cache-*.npy"):
+        if OldCachePath != CachePath:
+            try:
+                os.remove(OldCachePath)
+            except OSError:
+                pass        # 他のプロセスが削除済みなど
+    TempPath = None
+    try:
+        [fd, TempPath] = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(FilePath)), suffix=".tmp")
+        with os.fdopen(fd, "wb") as tempfile00:
+            np.save(tempfile00, SRValues)
+        os.replace(TempPath, CachePath)
+        return np.load(CachePath, mmap_mode="r")
+    except (OSError, ValueError):
+        # 書き込めない, 読み込めない場合は読み込んだ配列をそのまま返す
+        if TempPath is not None and os.path.exists(TempPath):
+            os.remove(TempPath)
+        return SRValues
+        # [i][j] i=0：1/1 0時 ～ 8760：12/31 24時, j=0：日時, j=1：法線面直達日射量, j=2：水平面天空日射量
+
+
+class SRData:
+    # 気象データ(1時間間隔, i=0：1/1 0時 ～ 8760：12/31 24時)の列
+    
+    __slots__ = ["FileName", "MMDDTT", "Sh", "Sdd", "Ssd", "HCTag"]
+    
+    def __init__(self, FileName, MMDDTT, Sdd, Ssd, HCTag):
+        
+        self.FileName = FileName
+        self.MMDDTT = np.asarray(MMDDTT, dtype=np.int32)          # 月日時刻の5桁or6桁表記
+        self.Sh = np.column_stack([Sdd, Ssd]).astype(np.float64)  # [法線面直達日射量, 水平面天空日射量][kcal/(m2h)]
+        [self.Sdd, self.Ssd] = [self.Sh[:, 0], self.Sh[:, 1]]
+        self.HCTag = np.asarray(HCTag, dtype=np.int8)             # 暖房期:1, 冷房期:2, 非空調期:0
+    
+    def __len__(self):
+        
+        return len(self.MMDDTT)
+    
+    @property
+    def values(self):
+        # 従来の SRHour.values[i][j] の形, j=0：日時, j=1：法線面直達日射量, j=2：水平面天空日射量, j=3：タグ
+        return np.column_stack([self.MMDDTT, self.Sdd, self.Ssd, self.HCTag])
+
+
+def input_SRData(Path00, FileName00, HStart, HEnd, CStart, CEnd, UseCache=True):
+    # Path00 = "./SCFConfig01/"
+    # FileName00 = "SRforSCF_**.csv"
+
+    if UseCache:
+        SRValues = input_SRCache(Path00, FileName00)
+    else:
+        csv_input = pd.read_csv(filepath_or_buffer=Path00+FileName00, encoding="ms932", sep=",")
+        if csv_input.columns[0]!=FileName00[-len(csv_input.columns[0]):]:
+            sys.exit("データが違います")
+        SRValues = csv_input.values[:, 0:3]
 
     """ \Zone.csv の設定で、暖房期,冷房期,非空調期を割り当て """
     # 元ファイルの4列目はなかったことになる。
-    [HeatingPeriod, CoolingPeriod, NonACPeriod] = [1, 2, 0]
-    for i in range(len(csv_input)):
-        if CStart <= csv_input.values[i][0] <= CEnd:
-            csv_input.values[i][3] = CoolingPeriod
-        elif CStart > CEnd and CStart <= csv_input.values[i][0]:
-            csv_input.values[i][3] = CoolingPeriod
-        elif CStart > CEnd and csv_input.values[i][0] <= CEnd:
-            csv_input.values[i][3] = CoolingPeriod
-        elif HStart <= csv_input.values[i][0] <= HEnd:
-            csv_input.values[i][3] = HeatingPeriod        
-        elif HStart > HEnd and HStart <= csv_input.values[i][0]:
-            csv_input.values[i][3] = HeatingPeriod
-        elif HStart > HEnd and csv_input.values[i][0] <= HEnd:
-            csv_input.values[i][3] = HeatingPeriod
-        else:
-            csv_input.values[i][3] = NonACPeriod        
+    HCTag = calc_HCTag(SRValues[:, 0], HStart, HEnd, CStart, CEnd)
     
-    return csv_input
-        # csv_input は SRHour に渡される
+    return SRData(FileName00, SRValues[:, 0], SRValues[:, 1], SRValues[:, 2], HCTag)
+        # SRData は SRHour に渡される
 
     
+""" 暖房期,冷房期,非空調期のタグ """
+def calc_HCTag(MMDDTT, HStart, HEnd, CStart, CEnd):
+    # MMDDTT:日時の5桁or6桁表記の配列
+    # 開始日 > 終了日 の場合は年をまたぐ期間(例：暖房期 110100～43024)として扱う
+    # 冷房期と暖房期が重なる日時は冷房期とする
+    
+    [HeatingPeriod, CoolingPeriod, NonACPeriod] = [1, 2, 0]
+    MMDDTT = np.asarray(MMDDTT)
+    if CStart <= CEnd:
+        Cooling = (CStart <= MMDDTT) & (MMDDTT <= CEnd)
+    else:
+        Cooling = (CStart <= MMDDTT) | (MMDDTT <= CEnd)
+    if HStart <= HEnd:
+        Heating = (HStart <= MMDDTT) & (MMDDTT <= HEnd)
+    else:
+        Heating = (HStart <= MMDDTT) | (MMDDTT <= HEnd)
+    HCTag = np.where(Cooling, CoolingPeriod, np.where(Heating, HeatingPeriod, NonACPeriod)).astype(np.int8)
+    
+    return HCTag
+
+
 """ 「月」の計算 """
 def calc_Month(MMDDTT):
     
@@ -1143,6 +1284,7 @@ def calc_Sdhm(MM, NDT, sinh, Sh, Shp, Nh, Nhp):
 #     - $ID=1$：解説書の入射角特性(「平成25年度省エネルギー基準に準拠した算定・判断の方法及び解説 I 非住宅建築物 第二版(連合印刷センター, 平成26年○月○日)」, pp.168-170, 式(2.1.25),(2.1.28),(2.1.32))
 #        $$\eta_{j,d,t}(\theta_{j,d,t}) = 2.3920 \cos \theta_{j,d,t} -3.8636 \cos^3 \theta_{j,d,t} + 3.7568 \cos^5 \theta_{j,d,t} - 1.3952 \cos^7 \theta_{j,d,t} $$
 #     - 他の特性を入れる際には、$ID$を違えて、`\IncidentAngleCharacteristics.csv` に追加する。
+# - `input_IncidentAngleCharacteristicsList`は、IDのリスト`IDs`の各行をまとめて読み込み、`etakk`を`(len(IDs), 8)`の配列で返す
 
 # In[27]:
 
@@ -1151,6 +1293,7 @@ def calc_Sdhm(MM, NDT, sinh, Sh, Shp, Nh, Nhp):
 # \地域区分+日射量データ+窓面入射角特性.xlsx "入射角特性"シート
 #   → \IncidentAngleCharacteristics.csv を作成 → 読み込み
 import pandas as pd
+import numpy as np
 import sys
 
 def input_IncidentAngleCharacteristics(ID, Path00, FileName00):
@@ -1172,6 +1315,24 @@ def input_IncidentAngleCharacteristics(ID, Path00, FileName00):
     return [ID0, etamax, etaisr, etakk]
 
 
+""" 複数の入射角特性の読み込み """
+def input_IncidentAngleCharacteristicsList(IDs, Path00, FileName00):
+    # IDs = [0, 1]      # 入射角特性のIDのリスト
+    
+    csv_input = pd.read_csv(filepath_or_buffer=Path00+FileName00, encoding="ms932", sep=",")
+    if csv_input.columns[0]!="入射角特性":
+        sys.exit("ファイル内に貼り付けたテスト条件が違います")
+    
+    # 同じIDが複数行ある場合は input_IncidentAngleCharacteristics と同じく後の行を使う
+    Rows = {ID0: i for [i, ID0] in enumerate(csv_input.values[:, 0])}
+    if any(ID not in Rows for ID in IDs):
+        sys.exit("指定したIDの入射角特性がありません")
+    Values = np.array([csv_input.values[Rows[ID]] for ID in IDs], dtype=float)
+    
+    return [Values[:, 0], Values[:, 1], Values[:, 2], Values[:, 3:11]]
+        # [ID0, etamax, etaisr, etakk], etakk[k][n]：k番目のIDの係数k_n
+
+
 # ### D.6 直達日射に対する窓ガラスの入射角特性 (緑本非住宅第二版pp.169 式(2.1.28)準拠)
 # 
 # - 「平成25年度省エネルギー基準に準拠した算定・判断の方法及び解説 I 非住宅建築物 第二版(連合印刷センター, 平成26年○月○日)」pp.168-170参照
@@ -1180,6 +1341,8 @@ def input_IncidentAngleCharacteristics(ID, Path00, FileName00):
 # 
 # $$\cos \theta_{j,d,t} = \cos h_{S,d,t} \cos (A_{ZS,d,t} - A_{ZW,i}) \qquad (2.1.26) $$
 # $$\eta_{j,d,t}(\theta_{j,d,t}) = \sum_{n=0}^7 k_n \cos^n \theta_{j,d,t} \qquad (2.1.28') $$
+# 
+# - $\eta_{j,d,t}$はホーナー法 $(\cdots(k_7 \cos \theta_{j,d,t} + k_6) \cos \theta_{j,d,t} + \cdots) \cos \theta_{j,d,t} + k_0$ で計算する(`costheta`の配列にもそのまま使える)
 
 # In[28]:
 
@@ -1196,7 +1359,12 @@ def calc_costheta(Azwjdt, cosh):
 
 def calc_etajdt(costheta, etakk):
 
-    etajdt = sum([etakk[i]*costheta**i for i in range(len(etakk))])
+    # ホーナー法で高次の係数から評価する → costheta, etakk[i] が配列でもそのまま計算できる
+    etajdt = 0
+    for kk in etakk[::-1]:
+        etajdt = etajdt * costheta + kk
+    #以下を上式で置き換え
+    #etajdt = sum([etakk[i]*costheta**i for i in range(len(etakk))])
         
     return etajdt
 
@@ -1310,7 +1478,7 @@ def calc_numisrym00(Sddhm, Ssdhm, etaisr, sinh, Awj, gammaym): #(2)式分子中
 """ 分子分母それぞれの和 """
 def calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh, Awj, Ax, gammayp, gammaym):
     
-    SCF00 = [0,0]
+    SCF00 = [0.0, 0.0]    # numba(F.8)でコンパイルする場合にfloatのリストとするため 0.0 で初期化
     
     # SCF00[0]:(2)式の分子への加算分(窓面積をかけた値として)
     SCF00[0] = ( calc_numdsr00(Sddhm, etajdt, costheta, Ax)
@@ -1338,6 +1506,10 @@ def calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh, Awj, Ax, gammayp, g
 #   - `h`$=0$：分子, `h`$=1$：分母, `h`$=2$：効果係数
 #   - `i`$=-2$：冷房期積算, `i`$=-1$：暖房期積算, `i`$=0$：非空調期積算, `i`$=1～12$：各月で積算
 #   - `j`$=-1$：日積算, `j`$=0～24$：各時刻で積算  
+# - 時間分割毎の積算先(`SCF[h]`を1次元化した位置)は`calc_OutputIndex`で求める(F.14 の分割計算と共通)
+# - 窓`N`個分の分子分母は`Output_ShadingCorrectionFactor_array`でまとめて積算する(Main X.2)
+#   - 積算先のインデックスは窓によらないので1回だけ求め、各窓は分子分母をまとめて1回の`np.bincount`で積算する
+#   - `Steps`(太陽が地平線上にある時間分割の索引, F.12)を指定した場合は、その時間分割の分子分母だけを受け取る。それ以外の時間分割の分子分母は0なので積算結果は変わらない
 # 
 #   
 # 
@@ -1347,60 +1519,1079 @@ def calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh, Awj, Ax, gammayp, g
 
 
 """ 期間積算処理 → 日よけ効果係数算出 """
+import numpy as np
+
+def calc_OutputIndex(SRHour, NDT, Grid=None):
+    # 時間分割毎の積算先のインデックス
+    # Hour00 = 0～8759(12/31 24時は含めない), MM = 0～NDT-1 の (8760, NDT) の配列を4組返す
+    
+    """ 積算先の時刻 → 時間刻みの格子 Grid(F.5) があれば、その Hour01 を参照 """
+    if Grid is not None:
+        Hour01 = Grid.Hour01
+    else:
+        Hour00 = np.arange(8760)
+        NHour = Hour00 % 24                                      # calc_NDayNHour と同じ
+        TT = NHour[:, None] + np.arange(NDT) / float(NDT)        # calc_TT と同じ
+        Hour01 = (TT + 0.5).astype(int)                          # calc_Hour01 と同じ
+    Month = calc_Month(SRHour.MMDDTT[0:8760])                # 「月」の計算(D.2)
+    HCTag = -SRHour.HCTag[0:8760].astype(int)                # 暖冷房期間のタグ
+    
+    # SCF[h][i][j] の (i, j) を、i を15で, j を26で割った余り(負のインデックスの位置)に直して1次元化
+    Rows = [np.broadcast_to(x[:, None] % 15, (8760, NDT)) for x in [HCTag, Month]]
+    # 期間×時刻, 期間×日積算, 月×時刻, 月×日積算 の4組 → 同じ積算先を持つ組はない
+    Index = [Rows[0] * 26 + Hour01, Rows[0] * 26 + 25, Rows[1] * 26 + Hour01, Rows[1] * 26 + 25]
+    
+    return Index
 
-def Output_ShadingCorrectionFactor(SRHour, NDT, SCF01):
 
-    SCF = [[[0 for j in range(-1,25)] for i in range(-2,13)] for h in range(0,3)] 
+def Output_ShadingCorrectionFactor(SRHour, NDT, SCF01, Grid=None):
+
+    """ 窓1個分として Output_ShadingCorrectionFactor_array で積算 """
+        # SCF01[h, Hour00, MM] は配列(float64, float32)をそのまま使う
+    SCF = Output_ShadingCorrectionFactor_array(SRHour, NDT, np.asarray(SCF01)[None, 0:2, 0:8760], Grid)[0]
         # SCF[h][i][j]に格納して積算
         # h = 0：分子, h = 1：分母, h = 2：効果係数
         # i = -2：冷房期積算, i = -1：暖房期積算, i = 0：非空調期積算,
         #         i = 1～12：各月で積算
         # j = -1：日積算, j = 0～24：各時刻で積算  
+
+    return SCF.tolist()
+
+
+def Output_ShadingCorrectionFactor_array(SRHour, NDT, SCF01, Grid=None, Steps=None):
+    # 窓N個分の分子分母をまとめて積算し、(N, 3, 15, 26)の配列を返す
+    # SCF01[n, h, Hour00, MM]：Steps を省略した場合(Hour00 = 0～8759)
+    # SCF01[n, h, s]：Steps(Hour00 * NDT + MM の配列)の s 番目の時間分割の分子分母。Steps の外は0として扱う
+    
+    SCF01 = np.asarray(SCF01)
+    SCF01 = SCF01.reshape(SCF01.shape[0:2] + (-1,))
+    SCF = np.zeros((len(SCF01), 3, 15 * 26))
+    
+    """ 時間分割毎の積算先のインデックス → 全窓で共通なので1回だけ求める """
+        # 4組の積算先を連結し、分子(h=0)と分母(h=1)の積算先を 15 * 26 ずらして並べる
+    Index = np.concatenate([Index00.ravel() if Steps is None else Index00.ravel()[Steps]
+                            for Index00 in calc_OutputIndex(SRHour, NDT, Grid)])
+    Index = np.concatenate([Index, Index + 15 * 26])
+    
+    """ 分子分母の期間,月,時間毎の積算(E.3) """
+        # 同じ積算先への加算は Hour00, MM の順に行われる(4組のうち同じ積算先を持つ組はない)
+    for n in range(len(SCF01)):
+        Weights = np.broadcast_to(SCF01[n, 0:2, None, :], (2, 4, SCF01.shape[-1])).ravel()
+        SCF[n, 0:2] = np.bincount(Index, weights=Weights, minlength=2 * 15 * 26).reshape(2, -1)
+    SCF = SCF.reshape(-1, 3, 15, 26)
+                    
+    """ 期間,月,時間毎の日よけ効果係数算出(E.1) """
+    np.divide(SCF[:, 0], SCF[:, 1], out=SCF[:, 2], where=(SCF[:, 1] != 0))
+
+    return SCF
+
+
+# ## F. 配列演算による一括計算
+# 
+# - A～E の関数は時刻 `Hour00`, 時間分割 `MM` 毎にスカラーで呼び出す形になっている
+# - 窓数や時間分割数`NDT`が大きい場合に備えて、1年分(`Hour00`$=0～8759$, `MM`$=0～$`NDT`$-1$)をNumPy配列で一括計算する版を用意する
+#   - 計算式はA～Eと同一。条件分岐は配列のマスク処理に置き換える
+#   - 配列の形は、時刻毎の値が`(8760,)`、時間分割毎の値が`(8760, NDT)`
+
+# ### F.1 太陽位置の一括計算 (仕様書6.2 式(4),(6)～(12))
+# 
+# - `calc_deltad`, `calc_sinh`, `calc_Azsdt`の配列版。日`NDay`, 時角`Tdt`などの配列から、太陽位置を一括で計算する
+#   - `deltad`：赤緯[deg], `sinh`：太陽高度の正弦, `Azsdt`：太陽方位角[deg]
+# - `calc_eed`, `calc_Tdt`, `calc_cosh`, `calc_hsdt` はそのまま配列に適用できるので流用する
+# - 1年分の太陽位置と`Nh`(D.3)は、地点毎の時間刻みの格子`TimeGrid`(F.5)でまとめて計算する
+
+# In[31]:
+
+
+""" 式(4),(8),(10)～(12) の配列版 """
+import numpy as np
+
+def calc_deltad_array(NDay):
+    
+    NDay = np.asarray(NDay, dtype=float)
+    deltad = (180 / np.pi) * (0.006322 - 0.405748 * np.cos(2 * np.pi * NDay / 366 + 0.153231)
+                                       - 0.005880 * np.cos(4 * np.pi * NDay / 366 + 0.207099)
+                                       - 0.003233 * np.cos(6 * np.pi * NDay / 366 + 0.620129))
+    
+    return deltad
+
+
+def calc_sinh_array(Latitude, deltad, Tdt):
+    
+    sinh = np.maximum(0, 
+                      np.sin(np.radians(Latitude)) * np.sin(np.radians(deltad)) 
+                        + np.cos(np.radians(Latitude)) * np.cos(np.radians(deltad)) * np.cos(np.radians(Tdt)) )
+    
+    return sinh
+
+
+def calc_Azsdt_array(Latitude, deltad, Tdt, sinh, cosh):
+    
+    sinAzsdt = np.cos(np.radians(deltad)) * np.sin(np.radians(Tdt)) / cosh
+    cosAzsdt = ( ( sinh * np.sin(np.radians(Latitude)) - np.sin(np.radians(deltad)) ) 
+             /   ( cosh * np.cos(np.radians(Latitude)) ) )
+    with np.errstate(divide="ignore"):
+        Azsdt00 = np.rad2deg(np.arctan( sinAzsdt / cosAzsdt ))
+    # calc_Azsdt の if 文の順に判定する
+    Azsdt = np.select([np.abs(sinAzsdt) == 1,
+                       (sinAzsdt > 0) & (cosAzsdt < 0),
+                       (sinAzsdt < 0) & (cosAzsdt < 0)],
+                      [90 * sinAzsdt, Azsdt00 + 180, Azsdt00 - 180], Azsdt00)
+    
+    return Azsdt
+
+
+# ### F.2 直達日射が窓に射す面積の一括計算 (仕様書6.2 式(1), 仕様書6.3 式(14)～(20))
+# 
+# - 窓面の法線ベクトルと太陽位置とのなす水平面上の角度`Azwjdt`と太陽高度`hsdt`の配列から、直達日射が窓に射す部分の面積`Ax`を一括で計算する
+#   - `calc_Aoh0p00`の式(15)条件2～4の場合分けは、`np.select`による配列の選択に置き換える
+#   - 式(15)条件1 と 日よけが影を落とさない条件も、`np.where`で0とする
+#   - 太陽が$x+$側, $x-$側にある時間分割だけを取り出して、それぞれ式(14), 式(18)を計算する
+# - `WSSize`の各要素は、スカラーのほか`Azwjdt`,`hsdt`とブロードキャストできる配列でもよい(窓の軸を持たせる場合)
+
+# In[32]:
+
+
+""" 式(1) の配列版 """
+import numpy as np
+
+def calc_Azwjdt_array(Azwj, Azsdt):
+    
+    Azwjdt = Azsdt - Azwj
+    Azwjdt = np.where(Azwjdt < -180, Azwjdt + 360, np.where(Azwjdt > 180, Azwjdt - 360, Azwjdt))
+        
+    return Azwjdt
+
+
+""" 式(15)～(20) の配列版 """
+def calc_Aoh0p00_array(X_th, Y_th, X_th_Z, Y_th_Z):
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Aoh0p00 = np.select([(X_th >= X_th_Z) & (Y_th >= Y_th_Z),
+                             Y_th * X_th_Z >= X_th * Y_th_Z],
+                            [(X_th - X_th_Z / 2) * Y_th_Z,                  # 式(15)条件4
+                             X_th ** 2 * Y_th_Z / X_th_Z / 2],              # 式(15)条件2
+                            (X_th - Y_th / 2 * X_th_Z / Y_th_Z) * Y_th)     # 式(15)条件3
+        
+    return Aoh0p00
+
+
+def calc_Aoh0_array(X_th, Y_th, X_th_Z, Y_th_Z):
+    
+    # 式(15),(16),(19),(20)条件1 と 日よけが影を落とさない条件をあわせて処理
+    Aoh0 = np.where((X_th_Z == 0) | (Y_th_Z <= 0), 0, calc_Aoh0p00_array(X_th, Y_th, X_th_Z, Y_th_Z))
+    
+    """ calc_Aoh0p00 の条件毎の評価回数の記録(F.9) """
+    if ActiveProfile is not None:
+        Active = ~((X_th_Z == 0) | (Y_th_Z <= 0))
+        Cond4 = Active & (X_th >= X_th_Z) & (Y_th >= Y_th_Z)
+        Cond2 = Active & ~Cond4 & (Y_th * X_th_Z >= X_th * Y_th_Z)
+        count_Profile("calc_Aoh0p00[条件4]", np.count_nonzero(Cond4))
+        count_Profile("calc_Aoh0p00[条件2]", np.count_nonzero(Cond2))
+        count_Profile("calc_Aoh0p00[条件3]", np.count_nonzero(Active & ~Cond4 & ~Cond2))
+    
+    return Aoh0
+
+
+def calc_Aoh0p_array(XX, YY, WSSize, TanAzw, Tanhs, CosAzw):
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    X_th = X3yp + X2 / 2 - XX
+    Y_th = Y1 + Y2 / 2 - YY
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X_th_Z = Zyp * TanAzw  
+        Y_th_Z = Zyp * Tanhs / CosAzw
+        
+    return calc_Aoh0_array(X_th, Y_th, X_th_Z, Y_th_Z)
+
+
+def calc_Asf0p_array(XX, YY, WSSize, TanAzw, Tanhs, CosAzw):
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    X_th = Y1xp + Y2 / 2 - YY
+    Y_th = X3 + X2 / 2 - XX
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X_th_Z = Zxp * Tanhs / CosAzw  
+        Y_th_Z = Zxp * TanAzw
+        
+    return calc_Aoh0_array(X_th, Y_th, X_th_Z, Y_th_Z)
+
+
+def calc_Aoh0m_array(XX, YY, WSSize, TanAzw, Tanhs, CosAzw):
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    X_th = X1yp + X2 / 2 + XX
+    Y_th = Y1 + Y2 / 2 - YY
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X_th_Z = Zyp * TanAzw  
+        Y_th_Z = Zyp * Tanhs / CosAzw
+        
+    return calc_Aoh0_array(X_th, Y_th, X_th_Z, Y_th_Z)
+
+
+def calc_Asf0m_array(XX, YY, WSSize, TanAzw, Tanhs, CosAzw):
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    X_th = Y1xm + Y2 / 2 - YY
+    Y_th = X1 + X2 / 2 + XX
+    with np.errstate(divide="ignore", invalid="ignore"):
+        X_th_Z = Zxm * Tanhs / CosAzw  
+        Y_th_Z = Zxm * TanAzw
+        
+    return calc_Aoh0_array(X_th, Y_th, X_th_Z, Y_th_Z)
+
+
+""" 式(14),(18) の配列版 """
+def calc_Axp_array(WSSize, Azw, hs):
+    
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    # 4隅 x 日よけ・袖壁の8回の呼び出しで共通の三角関数は1回だけ計算する
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Tan = [np.tan(np.abs(np.radians(Azw))), np.tan(np.radians(hs)), np.cos(np.radians(Azw))]
+    
+    Axp = ( (X2 + X3) * (Y1 + Y2) 
+           - calc_Aoh0p_array(-X2/2, -Y2/2, WSSize, *Tan) 
+           - calc_Asf0p_array(-X2/2, -Y2/2, WSSize, *Tan) )\
+        - ( (X2 + X3) * Y1        
+           - calc_Aoh0p_array(-X2/2,  Y2/2, WSSize, *Tan) 
+           - calc_Asf0p_array(-X2/2,  Y2/2, WSSize, *Tan) ) \
+        - ( X3 * (Y1 + Y2)        
+           - calc_Aoh0p_array( X2/2, -Y2/2, WSSize, *Tan) 
+           - calc_Asf0p_array( X2/2, -Y2/2, WSSize, *Tan) ) \
+        + ( X3 * Y1               
+           - calc_Aoh0p_array( X2/2,  Y2/2, WSSize, *Tan) 
+           - calc_Asf0p_array( X2/2,  Y2/2, WSSize, *Tan) )       
+    Axp = np.maximum(0, np.minimum(Axp, X2 * Y2))    #負値は0に、X2*Y2を超える場合はX2*Y2で頭打ち
+    Axp = np.where((hs > 0) & (-90 < Azw) & (Azw < 0), Axp, 0)
+        
+    return Axp
+
+
+def calc_Axm_array(WSSize, Azw, hs):
+    
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] = WSSize
+    
+    # 4隅 x 日よけ・袖壁の8回の呼び出しで共通の三角関数は1回だけ計算する
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Tan = [np.tan(np.abs(np.radians(Azw))), np.tan(np.radians(hs)), np.cos(np.radians(Azw))]
+    
+    Axm = ( (X1 + X2) * (Y1 + Y2) 
+           - calc_Aoh0m_array( X2/2, -Y2/2, WSSize, *Tan) 
+           - calc_Asf0m_array( X2/2, -Y2/2, WSSize, *Tan) )\
+        - ( (X1 + X2) * Y1        
+           - calc_Aoh0m_array( X2/2,  Y2/2, WSSize, *Tan) 
+           - calc_Asf0m_array( X2/2,  Y2/2, WSSize, *Tan) ) \
+        - ( X1 * (Y1 + Y2)        
+           - calc_Aoh0m_array(-X2/2, -Y2/2, WSSize, *Tan) 
+           - calc_Asf0m_array(-X2/2, -Y2/2, WSSize, *Tan) ) \
+        + ( X1 * Y1               
+           - calc_Aoh0m_array(-X2/2,  Y2/2, WSSize, *Tan) 
+           - calc_Asf0m_array(-X2/2,  Y2/2, WSSize, *Tan) )       
+    Axm = np.maximum(0, np.minimum(Axm, X2 * Y2))    #負値は0に、X2*Y2を超える場合はX2*Y2で頭打ち
+    Axm = np.where((hs > 0) & (0 <= Azw) & (Azw < 90), Axm, 0)
+        
+    return Axm
+
+
+""" 直達日射が窓に射す部分の面積(B.7) の配列版 """
+def calc_Ax_array(WSSize, Azw, hs):
+    
+    Azw = np.asarray(Azw, dtype=float)
+    hs = np.asarray(hs, dtype=float)
+    Ax = np.zeros(np.broadcast(Azw, hs, *WSSize).shape)
+    
+    # 太陽がx+側, x-側にある時間分割だけを取り出して計算し、Axに書き戻す
+    for [mask, calc_Ax00] in [[(hs > 0) & (-90 < Azw) & (Azw < 0), calc_Axp_array],
+                              [(hs > 0) & (0 <= Azw) & (Azw < 90), calc_Axm_array]]:
+        mask = np.broadcast_to(mask, Ax.shape)
+        # 窓毎に異ならない寸法(スカラー)は取り出さずにそのまま渡す
+        WSSize00 = [x if np.ndim(x) == 0 else np.broadcast_to(x, Ax.shape)[mask] for x in WSSize]
+        Ax[mask] = calc_Ax00(WSSize00, np.broadcast_to(Azw, Ax.shape)[mask], np.broadcast_to(hs, Ax.shape)[mask])
+        count_Profile("calc_Ax", np.count_nonzero(mask))        # 面積を計算した時間分割数の記録(F.9)
+        
+    return Ax
+
+
+# ### F.3 地点毎の太陽位置テーブルのキャッシュ
+# 
+# - `Nh`と太陽位置(F.1)は、緯度`Latitude`, 経度`Longitude`, 時間分割数`NDT`だけで決まり、窓の寸法・方位にはよらない
+#   - 同じ地域の窓を続けて計算する場合に再計算しないよう、時間刻みの格子`TimeGrid`(F.5)をプロセス内でキャッシュする
+#   - キャッシュの上限は`SolarTableCacheSize`件。上限を超えると、最も長く使われていないものから破棄(LRU)
+#   - ヒット数, ミス数は`get_TimeGrid.cache_info()`で確認できる。`get_TimeGrid.cache_clear()`で破棄
+# - キャッシュした配列は共有されるので、書き込み不可にしてある
+
+# In[33]:
+
+
+""" 太陽位置テーブルのキャッシュ """
+import functools
+
+SolarTableCacheSize = 16
+
+@functools.lru_cache(maxsize=SolarTableCacheSize)
+def get_TimeGrid(Latitude, Longitude, NDT):
+    
+    """ 時間刻みの格子, 正時±30分で太陽が地平線上にある時間刻み数のカウント(F.5, D.3) """
+    return TimeGrid(Latitude, Longitude, NDT)
+
+
+# ### F.4 直達日射の入射角の一括計算 (緑本非住宅第二版pp.169 式(2.1.26)準拠)
+# 
+# - `calc_costheta`の`max`を`np.maximum`に置き換えたもの
+# - `calc_etajdt`, `calc_SCF00`(E.2)は四則演算のみなので、そのまま配列に適用できる
+
+# In[34]:
+
+
+""" 式(2.1.26) の配列版 """
+import numpy as np
+
+def calc_costheta_array(Azwjdt, cosh):
+
+    costheta = np.maximum(cosh * np.cos(np.radians(Azwjdt)), 0)
+
+    return costheta
+
+
+# ### F.5 時間刻みの格子
+# 
+# - `Nh`(D.3)の正時±30分の時間刻みは、`NDT`が偶数なら前時刻の`MM`$=$`NDT`$/2～$`NDT`$-1$と同時刻の`MM`$=0～$`NDT`$/2$で、太陽位置(F.1)の時間刻みと同じ時刻になる
+#   - 太陽高度を1回だけ計算し、`Nh`と太陽位置の両方で参照できるよう、`Hour00`$=-1～8760$の`(8762, NDT)`の格子`TimeGrid`にまとめる
+#   - `Hour00`$=-1$は1/1の0時の30分前、`Hour00`$=8760$は12/31の24時(24時～24時30分)の分で、赤緯,均時差はそれぞれ1/1, 12/31の値とする(`calc_Nh`と同じ)
+#   - 各日0時の30分前は前日の赤緯,均時差で計算することになるが、`calc_Nh`のコメントのとおり白夜でなければ日が昇らないので`Nh`は変わらない
+# - 太陽高度の正弦の計算回数`NSinh`は、`Nh`と太陽位置を別々に計算する場合の`8761*(NDT+1) + 8760*NDT`回から`8762*NDT`回になる(Benchmark Y.1)
+# - `NDT`$=1$, 偶数の場合分けは`calc_Nh`と同じ。それ以外の`NDT`は`ValueError`とする
+# - `SolarTable`は、格子から従来の`[Nh, deltad, eed, Tdt, sinh, cosh, hsdt, Azsdt]`(`Nh`以外は1年分)を取り出す
+# - 1年分(`Hour00`$=0～8759$)の値は`Year`で取り出す。積算先の時刻`Hour01`(E.3)も格子に持たせる
+
+# In[35]:
+
+
+""" 時間刻みの格子 """
+import numpy as np
+
+class TimeGrid:
+    
+    def __init__(self, Latitude, Longitude, NDT):
+        
+        if not (NDT == 1 or (NDT > 0 and NDT % 2 == 0)):
+            raise ValueError("1時間あたりの時間分割数は1もしくは2以上の偶数とする必要があります (NDT = {})".format(NDT))
+        [self.Latitude, self.Longitude, self.NDT] = [Latitude, Longitude, NDT]
+        
+        # Hour00:-1(1/1 0時の前)～8760(12/31 24時), NDay:通しの日数(1～365), NHour:時刻 → calc_NDayNHour と同じ
+        Hour00 = np.arange(-1, 8761)
+        NDay = np.clip(Hour00 // 24 + 1, 1, 365)
+        NHour = Hour00 - (NDay - 1) * 24
         
-    """ +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ 1時間のループ ++++ """       
-    for Hour00 in range(8760):      # ← 12/31 24時は回さないのでHour00=8759がループの最後
+        # TT[Hour00+1][MM]:時間分割MM毎の時刻[hour] → calc_TT と同じ
+        self.TT = NHour[:, None] + np.arange(NDT) / float(NDT)
+        
+        """ 太陽位置(F.1) """
+        self.deltad = calc_deltad_array(NDay)
+        self.eed = calc_eed(NDay)
+        self.Tdt = calc_Tdt(Longitude, self.eed[:, None], self.TT)
+        self.sinh = calc_sinh_array(Latitude, self.deltad[:, None], self.Tdt)
+        self.cosh = calc_cosh(self.sinh)
+        self.hsdt = calc_hsdt(self.cosh, self.sinh)
+        self.Azsdt = calc_Azsdt_array(Latitude, self.deltad[:, None], self.Tdt, self.sinh, self.cosh)
+        self.NSinh = self.sinh.size
+        
+        """ 正時±30分で太陽が地平線上にある時間刻み数のカウント(D.3) """
+            # Nh[Hour00]:Hour00 = 0(1/1 0時)～8760(12/31 24時)
+        SunUp = self.sinh > 0
+        if NDT == 1:
+            self.Nh = SunUp[1:, 0].astype(float)
+        else:
+            M2 = int(NDT/2)
+            self.Nh = ( SunUp[:-1, M2:].sum(axis=1, dtype=float) + SunUp[1:, :M2+1].sum(axis=1, dtype=float)
+                      - 0.5 * SunUp[:-1, M2] - 0.5 * SunUp[1:, M2] )
         
-        """ 日時の計算(A.1) """
-        [NDay,NHour] = calc_NDayNHour(Hour00)           
+        """ 積算先の時刻(E.3) → calc_Hour01 と同じ """
+        self.Hour01 = (self.Year(self.TT) + 0.5).astype(int)
+        
+        for x in [self.TT, self.deltad, self.eed, self.Tdt, self.sinh, self.cosh, self.hsdt, self.Azsdt, 
+                  self.Nh, self.Hour01]:
+            x.setflags(write=False)
+    
+    def Year(self, x):
+        # 1年分(Hour00 = 0～8759)の行を取り出す
+        return x[1:8761]
+    
+    def SolarTable(self):
+        # [Nh, deltad, eed, Tdt, sinh, cosh, hsdt, Azsdt], Nh以外は1年分
+        return [self.Nh] + [self.Year(x) for x in [self.deltad, self.eed, self.Tdt, self.sinh, self.cosh, 
+                                                   self.hsdt, self.Azsdt]]
+
+
+
+# ### F.6 時間刻みの日射量の一括計算 (仕様書6.2 式(3)の計算, 図5参照)
+# 
+# - `calc_Sdhm`(D.4)の配列版。法線面直達日射量, 水平面天空日射量など、日射量の列`Sh`を`K`列まとめて計算する
+#   - `Sh[Hour00][k]`：`Hour00`$=0～8760$の時刻毎の日射量, `Nh[Hour00]`：`Hour00`$=0～8760$
+#   - `sinh[Hour00][MM]`：`Hour00`$=0～8759$の太陽高度の正弦`(8760, NDT)`
+# - 戻り値は`Sdhm[k][Hour00][MM]`の`(K, 8760, NDT)`の配列
+#   - `MM`$=$`NDT`$/2$で前後の時刻の値を平均すること, `Nh`$=0$の時刻の値を使わないことは`calc_Sdhm`と同じ
+#   - 日射量の列を増やしても、条件の判定は1回で済む
+# - `Hours`(`Hour00`の配列)を与えた場合は、その時刻の分だけを計算し、`(K, len(Hours), NDT)`の配列を返す
+#   - `sinh`は`Hours`の時刻の`(len(Hours), NDT)`とする。`Sh`, `Nh`は1年分を与え、次時刻の値はそこから参照する
+# - `Steps`(`(8760, NDT)`を1次元化した時間分割の位置`Hour00`$\times$`NDT`$+$`MM`の配列, F.12)を与えた場合は、その時間分割の分だけを計算し、`(K, len(Steps))`の配列を返す
+#   - `sinh`は`Steps`の時間分割の`(len(Steps),)`とする
+
+# In[36]:
+
+
+""" 式(3)の S'HM の配列版 """
+import numpy as np
+
+def calc_Sdhm_array(NDT, sinh, Sh, Nh, Hours=None, Steps=None):
+    
+    Sh = np.asarray(Sh, dtype=float).reshape(8761, -1).T     # Sh[k][Hour00]
+    Nh = np.asarray(Nh, dtype=float)                         # Nh[Hour00]
+    
+    # 時刻 Hour00, 時間分割 MM → Steps があれば時間分割毎, なければ(Hours の)時刻 × MM = 0～NDT-1
+    if Steps is not None:
+        Steps = np.asarray(Steps, dtype=int)
+        [Hours, MM] = [Steps // NDT, Steps % NDT]
+    else:
+        Hours = np.arange(8760) if Hours is None else np.asarray(Hours, dtype=int)
+        [Hours, MM] = [Hours[:, None], np.arange(NDT)]
+    
+    # 同時刻(Hour00), 次時刻(Hour00+1)の値
+    [ShH, ShHp, NhH, NhHp] = [Sh[:, Hours], Sh[:, Hours + 1], Nh[Hours], Nh[Hours + 1]]
+    
+    # 同時刻の値を使う時間分割(MM <= NDT/2), 次時刻の値を使う時間分割(MM >= NDT/2)
+    UseH = (MM <= NDT/2) & (NhH > 0)
+    UseHp = (MM >= NDT/2) & (NhHp > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        Sdhm = ( ( np.where(UseH, ShH / NhH, 0)
+                 + np.where(UseHp, ShHp / NhHp, 0) )
+               / np.where(MM == NDT/2, 2, 1) )
+    Sdhm = np.where(sinh > 0, Sdhm, 0)
+    count_Profile("calc_Sdhm", Sdhm.size)    # 呼び出し回数の記録(F.9)
+    
+    return Sdhm
+
+
+# ### F.7 形態係数, 天空・反射日射の効果係数の一括計算 (仕様書6.4 式(21)～(23), 仕様書6.5 式(24),(25))
+# 
+# - `calc_fa`(C.1), `calc_phiyp`(C.2), `calc_phiym`(C.4)の配列版。窓および日よけの寸法一式`WSSize`を行とする`(N, 18)`の配列`WSSizes`から、`N`個の窓の値を一括で計算する
+#   - `WSSizes`が`(18,)`の場合は、窓1個分(スカラー)を返す
+#   - $y^2+z^2=0$, $x^2+y^2+z^2=0$の場合に0とすること, $\phi$を$0～0.5$に収めることは、スカラー版と同じ
+# - `get_gammay`は、`WSSize`のタプルをキーとして`(gammayp, gammaym)`をプロセス内でキャッシュする
+#   - キャッシュした値は呼び出し元で共有されるので、リストではなくタプルで返す
+#   - 対話的に同じ寸法で繰り返し計算する場合用。上限は`GammaCacheSize`件(LRU), `get_gammay_cached.cache_info()`で確認できる
+
+# In[37]:
+
+
+""" 式(21)～(25) の配列版 """
+import numpy as np
+import functools
+
+def calc_fa_atan_array(x, y, z):
+    
+    r2 = y**2 + z**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fa_atan = np.where(r2 > 0, x * r2 **0.5 / 2 * np.arctan( x / r2 **0.5 ), 0)
+    
+    return fa_atan
+
+
+def calc_fa_log_array(x, y, z):
+    
+    r2 = x**2 + y**2 + z**2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fa_log = np.where(r2 > 0, ( x**2 - y**2 - z**2 ) / 8 * np.log( r2 ), 0)
+    
+    return fa_log
+
+
+def calc_fa_array(xa, xb, ya, yb, za):
+    
+    fa = ( calc_fa_atan_array(xb, yb, za) - calc_fa_atan_array(xb, ya, za)
+         - calc_fa_atan_array(xa, yb, za) + calc_fa_atan_array(xa, ya, za)
+         + calc_fa_log_array(xb, yb, za)  - calc_fa_log_array(xb, ya, za)
+         - calc_fa_log_array(xa, yb, za)  + calc_fa_log_array(xa, ya, za) )
+  
+    return fa
+
+
+def calc_phiyp_array(WSSizes):
+    
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] \
+        = np.asarray(WSSizes, dtype=float).T
+    
+    phiyp = ( 1 / ( np.pi * X2 * Y2 )
+            * ( calc_fa_array(X3yp, X2 + X3yp, Y1, Y1 + Y2, Zyp) + calc_fa_array(Y1xp, Y1xp + Y2, X3, X2 + X3, Zxp) 
+              + calc_fa_array(X1yp, X1yp + X2, Y1, Y1 + Y2, Zyp) + calc_fa_array(Y1xm, Y1xm + Y2, X1, X1 + X2, Zxm)  
+              + calc_fa_array(X3,   X2  +  X3, Y1, Y1 + Y2, 0  ) + calc_fa_array(Y1,   Y1  +  Y2, X3, X2 + X3, 0  ) 
+              + calc_fa_array(X1,   X1  +  X2, Y1, Y1 + Y2, 0  ) + calc_fa_array(Y1,   Y1  +  Y2, X1, X1 + X2, 0  )     
+              - calc_fa_array(X3yp, X2 + X3yp, Y1, Y1 + Y2, 0  ) - calc_fa_array(Y1xp, Y1xp + Y2, X3, X2 + X3, 0  ) 
+              - calc_fa_array(X1yp, X1yp + X2, Y1, Y1 + Y2, 0  ) - calc_fa_array(Y1xm, Y1xm + Y2, X1, X1 + X2, 0  ) ) ) 
+    phiyp = np.maximum(0, np.minimum(phiyp, 0.5))    #負値は0に、0.5を超える場合は0.5で頭打ち
+    
+    return phiyp
+
+
+def calc_phiym_array(WSSizes):
+    
+    [X1, X2, X3, X1yp, X1ym, X3yp, X3ym, Y1, Y2, Y3, Y1xp, Y1xm, Y3xp, Y3xm, Zxp, Zxm, Zyp, Zym] \
+        = np.asarray(WSSizes, dtype=float).T
+    
+    phiym = ( 1 / ( np.pi * X2 * Y2 )
+            * ( calc_fa_array(X3ym, X2 + X3ym, Y3, Y2 + Y3, Zym) + calc_fa_array(Y3xp, Y2 + Y3xp, X3, X2 + X3, Zxp) 
+              + calc_fa_array(X1ym, X1ym + X2, Y3, Y2 + Y3, Zym) + calc_fa_array(Y3xm, Y2 + Y3xm, X1, X1 + X2, Zxm)  
+              + calc_fa_array(X3,   X2  +  X3, Y3, Y2 + Y3, 0  ) + calc_fa_array(Y3,   Y2  +  Y3, X3, X2 + X3, 0  ) 
+              + calc_fa_array(X1,   X1  +  X2, Y3, Y2 + Y3, 0  ) + calc_fa_array(Y3,   Y2  +  Y3, X1, X1 + X2, 0  )     
+              - calc_fa_array(X3ym, X2 + X3ym, Y3, Y2 + Y3, 0  ) - calc_fa_array(Y3xp, Y2 + Y3xp, X3, X2 + X3, 0  ) 
+              - calc_fa_array(X1ym, X1ym + X2, Y3, Y2 + Y3, 0  ) - calc_fa_array(Y3xm, Y2 + Y3xm, X1, X1 + X2, 0  ) ) ) 
+    phiym = np.maximum(0, np.minimum(phiym, 0.5))    #負値は0に、0.5を超える場合は0.5で頭打ち
+    
+    return phiym
+
+
+def calc_gammayp_array(WSSizes):
+    
+    gammayp = 2 * calc_phiyp_array(WSSizes)
+    
+    return gammayp
+
+
+def calc_gammaym_array(WSSizes):
+    
+    gammaym = 2 * calc_phiym_array(WSSizes)
+    
+    return gammaym
+
+
+""" 天空・反射日射の効果係数のキャッシュ """
+GammaCacheSize = 1024
+
+@functools.lru_cache(maxsize=GammaCacheSize)
+def get_gammay_cached(WSSizeKey):
+    
+    # 呼び出し元で共有されるので、書き換えできないタプルで返す
+    return (float(calc_gammayp_array(WSSizeKey)), float(calc_gammaym_array(WSSizeKey)))
+
+
+def get_gammay(WSSize):
+    # WSSize の各値を float のタプルにしてキーとする
+    
+    return get_gammay_cached(tuple(float(x) for x in WSSize))
+        # (gammayp, gammaym)
+
+
+# ### F.8 numba による時間分割毎の計算
+# 
+# - 太陽位置(A.4～A.7)から分子分母(E.2)までを、時刻`Hour00`, 時間分割`MM`の1つのループ`calc_SCF01_loop`にまとめ、`numba`でコンパイルして計算する
+#   - A～Eのスカラー版の関数をそのままコンパイルする。`calc_Aoh0p00`, `calc_Azsdt`の場合分けもスカラーのif文のまま
+#   - 関数内の参照先をコンパイル版に差し替えるため、`NumbaFunctions`の関数を共通の名前空間で作り直してから`numba.njit`にかける
+#   - ゼロ除算は NumPy と同じ扱い(`error_model="numpy"`)とする
+#   - `Nh`は時間刻みの格子(F.5)の値を使う
+# - `numba`がインストールされていない場合は`NumbaAvailable = False`となり、本体プログラムは NumPy 版(F.1～F.7)で計算する
+# - コンパイルは初回の呼び出し時に行う(数秒かかる)
+
+# In[38]:
+
+
+""" numba による時間分割毎の計算 """
+import numpy as np
+import types
+
+try:
+    import numba
+    NumbaAvailable = True
+except ImportError:
+    numba = None
+    NumbaAvailable = False
+
+
+def calc_SCF01_loop(Latitude, Longitude, NDT, Nh, Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym, SCF01):
+    
+    for Hour00 in range(8760):
+        NDay = Hour00 // 24 + 1                 # calc_NDayNHour と同じ
+        NHour = Hour00 - (NDay - 1) * 24
+        deltad = calc_deltad(NDay)
+        eed = calc_eed(NDay)
         
-        """ 「月」の計算(D.2) """
-        Month = calc_Month(SRHour.values[Hour00][0])        
- 
-        """ +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ (1/NDT)時間のループ ++++ """ 
-            # MM:1時間の内の(1/NDT)間隔の順番, 正時がMM=0, MM=0～NDT-1
         for MM in range(NDT):
-            """ 時刻TTの計算(A.1) """
-                # TT:時間分割MM毎の時刻[hour]
-            TT = calc_TT(NHour, NDT, MM)
+            """ 太陽位置(A.4～A.7), 窓面の法線ベクトルと太陽位置とのなす水平面上の角度(A.9) """
+            Tdt = calc_Tdt(Longitude, eed, calc_TT(NHour, NDT, MM))
+            sinh = calc_sinh(Latitude, deltad, Tdt)
+            cosh = calc_cosh(sinh)
+            hsdt = calc_hsdt(cosh, sinh)
+            Azsdt = calc_Azsdt(Latitude, deltad, Tdt, sinh, cosh)
+            Azwjdt = calc_Azwjdt(Azwj, Azsdt)
             
-            """ 時刻Hour01の計算(A.1) """
-                # Hour01:前時刻のMM=NDT/2～同時刻のMM=NDT/2-1の時間分割を、その正時に属するものとして
-                #        扱うための時刻 → 効果係数算定のための積算用
-            Hour01 = calc_Hour01(TT)
+            """ (1/NDT)分割MM番目の法線面直達日射量, 水平面天空日射量(D.4) """
+            Sddhm = calc_Sdhm(MM, NDT, sinh, Sh[Hour00, 0], Sh[Hour00+1, 0], Nh[Hour00], Nh[Hour00+1])
+            Ssdhm = calc_Sdhm(MM, NDT, sinh, Sh[Hour00, 1], Sh[Hour00+1, 1], Nh[Hour00], Nh[Hour00+1])
             
-            """ 暖冷房期間のタグ """            
-            HCTag = -SRHour.values[Hour00][3]
-
-            """ 分子分母の期間,月,時間毎の積算(E.3) """
-            for h in range(0, 2):
-                SCF[h][HCTag][Hour01] += SCF01[h][Hour00][MM]
-                SCF[h][HCTag][-1]     += SCF01[h][Hour00][MM]        
-                SCF[h][Month][Hour01] += SCF01[h][Hour00][MM]
-                SCF[h][Month][-1]     += SCF01[h][Hour00][MM]                      
-                    # SCF[h][i][j]に格納して積算
-                    # h = 0：分子, h = 1：分母, h = 2：効果係数
-                    # i = -2：冷房期積算, i = -1：暖房期積算, i = 0：非空調期積算,
-                    #         i = 1～12：各月で積算
-                    # j = -1：日積算, j = 0～24：各時刻で積算             
-                    
-    """ 期間,月,時間毎の日よけ効果係数算出(E.1) """
-    for i in range(-2,13):
-        for j in range(-1,25):
-            if SCF[1][i][j] != 0:
-                SCF[2][i][j] = SCF[0][i][j] / SCF[1][i][j]
-            else:
-                SCF[2][i][j] = 0
+            """ 直達日射の入射角, 入射角特性(D.6), 直達日射が窓に射す部分の面積(B.7) """
+            costheta = calc_costheta(Azwjdt, cosh)
+            etajdt = calc_etajdt(costheta, etakk)
+            Ax = calc_Ax(WSSize, Azwjdt, hsdt)
+            
+            """ 日よけ効果係数算定式の時刻TTにおける分子分母(E.2) """
+            SCF00 = calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh, Awj, Ax, gammayp, gammaym)
+            SCF01[0, Hour00, MM] = SCF00[0]
+            SCF01[1, Hour00, MM] = SCF00[1]
 
-    return SCF
 
+NumbaFunctions = {}
+
+def get_NumbaFunctions():
+    # 初回の呼び出し時に、関数を共通の名前空間 NumbaFunctions で作り直して numba.njit にかける
+    
+    if NumbaFunctions:
+        return NumbaFunctions
+    if not NumbaAvailable:
+        raise ImportError("numba がインストールされていません")
+    
+    NumbaFunctions.update({"np": np, "__builtins__": __builtins__})
+    for Name in ["calc_deltad", "calc_eed", "calc_TT", "calc_Tdt", "calc_sinh", "calc_cosh", "calc_hsdt", 
+                 "calc_Azsdt", "calc_Azwjdt", "calc_Sdhm", "calc_costheta", "calc_etajdt", 
+                 "calc_Aoh0p", "calc_Aoh0p00", "calc_Asf0p", "calc_Axp", "calc_Aoh0m", "calc_Asf0m", "calc_Axm", 
+                 "calc_Ax", "calc_dendsr00", "calc_numdsr00", "calc_denisryp00", "calc_numisryp00", 
+                 "calc_denisrym00", "calc_numisrym00", "calc_SCF00", "calc_SCF01_loop"]:
+        Function = globals()[Name]
+        NumbaFunctions[Name] = numba.njit(error_model="numpy")(
+            types.FunctionType(Function.__code__, NumbaFunctions, Name, Function.__defaults__))
+    
+    return NumbaFunctions
+
+
+def calc_SCF01_numba(Latitude, Longitude, NDT, Nh, Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym, 
+                     DType=np.float64):
+    # Sh[Hour00][k]:Hour00 = 0～8760, k = 0：法線面直達日射量, k = 1：水平面天空日射量
+    
+    SCF01 = np.zeros((2, 8760, NDT), dtype=DType)
+    get_NumbaFunctions()["calc_SCF01_loop"](
+        float(Latitude), float(Longitude), int(NDT), np.ascontiguousarray(Nh, dtype=float), 
+        np.ascontiguousarray(Sh, dtype=float), float(Azwj), tuple(float(x) for x in WSSize), 
+        np.ascontiguousarray(etakk, dtype=float), float(etaisr), float(Awj), float(gammayp), float(gammaym), SCF01)
+    
+    return SCF01
+        # SCF01[h, Hour00, MM]:時間分割毎の(2)式の分子(h=0),分母(h=1)
+
+
+# ### F.9 計算過程の記録(プロファイル)
+# 
+# - `with profiling() as Profile:`の中で計算すると、段階毎の計算時間, 関数の呼び出し回数, メモリ使用量のピークを`Profile`に記録する
+#   - 記録していないときは、`lap_Profile`, `count_Profile`は何もしない
+#   - `Profile.record()`で`{"Total": 全体の時間[s], "Stages": {段階: 時間[s]}, "Counts": {関数: 回数}, "PeakMemory": ピーク[byte]}`を返す
+# - 段階の時間は、`lap_Profile(段階)`を呼んだ時点までの、前回の`lap_Profile`(最初は`profiling`の開始)からの経過時間とする
+# - 呼び出し回数は、スカラー版(A～E)で1時間分割毎に呼び出していた場合の回数に換算して数える
+#   - `calc_Ax`：直達日射が窓に射す面積を計算した時間分割数(F.2)。太陽が地平線下や窓面の裏側にあって計算しなかった時間分割は数えない
+#   - `calc_Aoh0p00[条件2]`～`[条件4]`：式(15)の条件毎に`calc_Aoh0p00`を評価した回数(式(16),(19),(20)の分も含む, F.2)
+#   - `calc_Sdhm`：時間刻みの日射量を求めた時間分割数×日射量の列数(F.6)
+#   - numba(F.8)で計算した場合は、呼び出し回数は数えない → `"Counts"`は空の辞書`{}`
+# - メモリ使用量のピークは、`profiling(Memory=True)`の場合だけ`tracemalloc`で計る(NumPy の配列も含まれる)
+#   - `tracemalloc`は計算を遅くする(Python のループで1時間分割毎に処理する部分ほど影響が大きい)ので、既定では計らない → `"PeakMemory"`は`None`
+#   - 段階毎の時間とメモリ使用量の両方が必要な場合は、`Memory=False`と`Memory=True`で2回計算して、時間は1回目の記録を使う
+
+# In[39]:
+
+
+""" 計算過程の記録 """
+import contextlib
+import collections
+import tracemalloc
+import time
+
+class SCFProfile:
+    
+    def __init__(self):
+        
+        self.Start = self.Last = time.perf_counter()
+        self.Total = 0.0
+        self.Stages = collections.OrderedDict()
+        self.Counts = collections.Counter()
+        self.PeakMemory = None
+    
+    def lap(self, Stage):
+        
+        Now = time.perf_counter()
+        self.Stages[Stage] = self.Stages.get(Stage, 0.0) + (Now - self.Last)
+        self.Last = Now
+    
+    def count(self, Name, N):
+        
+        self.Counts[Name] += int(N)
+    
+    def record(self):
+        
+        return {"Total": self.Total, "Stages": dict(self.Stages), "Counts": dict(self.Counts), 
+                "PeakMemory": self.PeakMemory}
+
+
+ActiveProfile = None
+
+@contextlib.contextmanager
+def profiling(Memory=False):
+    global ActiveProfile
+    
+    [Previous, ActiveProfile] = [ActiveProfile, SCFProfile()]
+    Tracing = tracemalloc.is_tracing()
+    if Memory:
+        if Tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start()
+    try:
+        yield ActiveProfile
+    finally:
+        ActiveProfile.Total = time.perf_counter() - ActiveProfile.Start
+        if Memory:
+            ActiveProfile.PeakMemory = tracemalloc.get_traced_memory()[1]
+            if not Tracing:
+                tracemalloc.stop()
+        ActiveProfile = Previous
+
+
+def lap_Profile(Stage):
+    
+    if ActiveProfile is not None:
+        ActiveProfile.lap(Stage)
+
+
+def count_Profile(Name, N):
+    
+    if ActiveProfile is not None:
+        ActiveProfile.count(Name, N)
+
+
+# ### F.10 時刻を指定した一括計算
+# 
+# - `calc_SCF01_steps`は、指定した時間分割`Steps`(`(8760, NDT)`を1次元化した位置`Hour00`$\times$`NDT`$+$`MM`の配列, F.12)の分だけ、時間分割毎の分子分母`SCF01`を一括計算する
+#   - 本体プログラム(Main X.1)では、太陽が地平線上にある時間分割`SunUp`(F.12)だけを計算するのに使う
+#   - 太陽位置は時間刻みの格子`Grid`(F.5)から取り出し、日射量は`calc_Sdhm_array`(F.6)に`Steps`を渡して計算する
+#   - `Nh`, 日射量`Sh`は1年分から参照するので、前後の時間分割を計算しなくても1年分を計算した場合と同じ値になる
+#   - 入射角特性`etajdt`は、窓面に直達日射が当たる(`costheta`$>0$)時間分割だけを計算する。それ以外の時間分割は直達成分が0になるので0のままとする
+#   - 直達日射が窓に射す部分の面積`calc_Ax_array`(F.2)も、太陽が窓面の前側にある時間分割だけを計算する
+#   - 戻り値は`SCF01[h][s]`の`(2, len(Steps))`の配列, `h`$=0$：分子, `h`$=1$：分母
+#   - 窓毎の値を`(N, 1, 1)`の形で与えた場合は`(2, N, len(Steps))`
+# - `calc_SCF01_hours`は、指定した時刻`Hours`(`Hour00`の配列)の分だけ`SCF01`を一括計算する
+#   - 1年分の`SCF01`を持たずに、時刻を区切って順に計算する場合に使う(Main X.5, F.14)
+#   - 時刻の中の太陽が地平線上にある時間分割だけを`calc_SCF01_steps`で計算し、それ以外の時間分割の分子分母は0とする
+#   - 戻り値は`SCF01[h][n][MM]`の`(2, len(Hours), NDT)`の配列, 窓毎の値を`(N, 1, 1)`の形で与えた場合は`(2, N, len(Hours), NDT)`
+
+# In[40]:
+
+
+""" 時刻を指定した一括計算 """
+import numpy as np
+
+def calc_SCF01_steps(Steps, Grid, Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym):
+    
+    Steps = np.asarray(Steps, dtype=int)
+    
+    """ 太陽位置 → 格子の1年分の行を1次元化した位置 """
+    [sinh, cosh, hsdt, Azsdt] = [Grid.Year(x).ravel()[Steps] for x in [Grid.sinh, Grid.cosh, Grid.hsdt, Grid.Azsdt]]
+    
+    """ (1/NDT)分割MM番目の法線面直達日射量, 水平面天空日射量(D.4, F.6) """
+    [Sddhm, Ssdhm] = calc_Sdhm_array(Grid.NDT, sinh, Sh, Grid.Nh, Steps=Steps)
+    
+    """ 直達日射の入射角(A.9, D.6, F.2, F.4) """
+    Azwjdt = calc_Azwjdt_array(Azwj, Azsdt)
+    costheta = calc_costheta_array(Azwjdt, cosh)
+    
+    """ 入射角特性(D.6) → 窓面に直達日射が当たる時間分割だけ計算 """
+    Shape = np.broadcast(costheta, *etakk).shape
+    SunOn = np.broadcast_to(costheta > 0, Shape)
+    etajdt = np.zeros(Shape)
+    etajdt[SunOn] = calc_etajdt(np.broadcast_to(costheta, Shape)[SunOn], 
+                                [np.broadcast_to(kk, Shape)[SunOn] if np.ndim(kk) > 0 else kk for kk in etakk])
+    
+    """ 直達日射が窓に射す部分の面積(B.7, F.2) """
+    Ax = calc_Ax_array(WSSize, Azwjdt, hsdt)
+    
+    """ 日よけ効果係数算定式の各時間分割における分子分母(E.2) """
+    SCF00 = calc_SCF00(Sddhm, Ssdhm, etajdt, etaisr, costheta, sinh, Awj, Ax, gammayp, gammaym)
+    Shape = np.broadcast(*SCF00).shape
+    SCF01 = np.empty((2,) + Shape)
+    [SCF01[0], SCF01[1]] = SCF00
+    
+    return SCF01.reshape((2,) + Shape[:-2] + (len(Steps),))
+        # 窓の軸 N がある場合は (2, N, 1, len(Steps)) → (2, N, len(Steps))
+
+
+def calc_SCF01_hours(Hours, Grid, Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym):
+    
+    Hours = np.asarray(Hours, dtype=int)
+    NDT = Grid.NDT
+    
+    """ 時刻の中の太陽が地平線上にある時間分割 → Hours × NDT の中の位置 Block と、1年分の中の位置 Steps """
+    Block = np.flatnonzero(Grid.sinh[Hours + 1].ravel() > 0)
+    Steps = Hours[Block // NDT] * NDT + Block % NDT
+    
+    """ 太陽が地平線上にある時間分割だけを計算 → それ以外の分子分母は0 """
+    SCF00 = calc_SCF01_steps(Steps, Grid, Sh, Azwj, WSSize, etakk, etaisr, Awj, gammayp, gammaym)
+    SCF01 = np.zeros(SCF00.shape[:-1] + (len(Hours) * NDT,))
+    SCF01[..., Block] = SCF00
+    
+    return SCF01.reshape(SCF00.shape[:-1] + (len(Hours), NDT))
+
+
+# ### F.11 計算する期間の選択
+# 
+# - `Period`：計算する期間のリスト。`"暖房期"`, `"冷房期"`, `"非空調期"`と月(1～12)を組み合わせて指定する
+#   - 例：`["冷房期"]`, `[7, 8]`, `["暖房期", 1]`
+# - `calc_PeriodHours`は、暖房冷房判定タグ(D.2)か月(`calc_Month`)が`Period`に含まれる時刻`Hour00`の配列`Hours`と、`Period`で値が確定する`SCF[h][i][j]`の行`i`のリスト`Rows`を返す
+#   - 行`i`は`"冷房期"`$\to -2$, `"暖房期"`$\to -1$, `"非空調期"`$\to 0$, 月$\to 1～12$(E.3)
+#   - 暖冷房期間, 月の行は、その期間の時刻の分子分母だけから積算される → `Hours`だけを計算しても、`Rows`の行は1年分を計算した場合と同じ値になる
+#   - 期間の境界の時刻でも、`Nh`, 次時刻の日射量は1年分から参照する(F.10)ので同じ
+# - `Period`の要素が不適切な場合(`True`, `False`を含む)は終了する
+# - `select_PeriodRows`は、`SCF[h][i][j]`の`Rows`以外の行を0とする
+
+# In[41]:
+
+
+""" 計算する期間の選択 """
+import numpy as np
+import sys
+
+PeriodTags = {"暖房期": 1, "冷房期": 2, "非空調期": 0}     # 暖房冷房判定タグ(D.2)
+PeriodRows = {"暖房期": -1, "冷房期": -2, "非空調期": 0}   # SCF[h][i][j]の行i(E.3)
+
+def calc_PeriodHours(SRHour, Period):
+    
+    Month = calc_Month(SRHour.MMDDTT[0:8760])
+    HCTag = SRHour.HCTag[0:8760]
+    
+    Selected = np.zeros(8760, dtype=bool)
+    Rows = []
+    for x in Period:
+        if isinstance(x, str) and x in PeriodTags:
+            Selected |= (HCTag == PeriodTags[x])
+            Rows.append(PeriodRows[x])
+        elif isinstance(x, (int, np.integer)) and not isinstance(x, bool) and 1 <= x <= 12:
+            Selected |= (Month == x)
+            Rows.append(int(x))
+        else:
+            sys.exit("計算する期間の指定が不適切です")
+    
+    return [np.flatnonzero(Selected), Rows]
+        # Hours:計算する時刻 Hour00 の配列, Rows:値が確定する行 i のリスト
+
+
+""" 期間で確定しない行を0とする """
+def select_PeriodRows(SCF, Rows):
+    
+    SCF = np.array(SCF)
+    SCF[:, [i for i in range(-2, 13) if i not in Rows]] = 0
+    
+    return SCF.tolist()
+
+
+# ### F.12 太陽が地平線上にある時間分割の索引
+# 
+# - 1年分`(8760, NDT)`の時間分割のうち、太陽が地平線下(`sinh`$\leq 0$)の時間分割は、日射量(D.4)が0なので分子分母とも0になる
+# - そこで、太陽が地平線上にある(`sinh`$>0$)時間分割`SunUp`の索引を用意し、本体プログラム(Main X.1)は`SunUp`の時間分割だけを一括計算(F.10)する
+#   - 索引は`(8760, NDT)`を1次元化した位置(`Hour00`$\times$`NDT`$+$`MM`)の配列
+#   - 窓面に直達日射が当たるかどうか(`costheta`$>0$)は窓面の方位毎に異なるので、索引には持たせず、一括計算(F.10)の中で判定する
+# - 索引は緯度`Latitude`, 経度`Longitude`, 時間分割数`NDT`だけで決まり、窓の寸法・方位にはよらないので、プロセス内でキャッシュする
+#   - キャッシュの上限は`SunIndexCacheSize`件(LRU)。配列は書き込み不可
+
+# In[42]:
+
+
+""" 太陽が地平線上にある時間分割の索引 """
+import numpy as np
+import functools
+
+SunIndexCacheSize = 16
+
+@functools.lru_cache(maxsize=SunIndexCacheSize)
+def get_SunIndex(Latitude, Longitude, NDT):
+    
+    Grid = get_TimeGrid(Latitude, Longitude, NDT)
+    
+    """ 太陽が地平線上にある時間分割 """
+    SunUp = np.flatnonzero(Grid.Year(Grid.sinh).ravel() > 0)
+    SunUp.setflags(write=False)
+    
+    return SunUp
+        # (8760, NDT)を1次元化した位置 Hour00 * NDT + MM の配列
+
+
+# ### F.13 計算結果の保存(列形式)
+# 
+# - ケース毎の`SCF[h][i][j]`を、ケースの条件とあわせて列毎の`.npy`ファイルとして保存する(計算結果のストア)
+#   - ストアはフォルダ`StorePath`。追記のたびに分割ファイル(シャード)`part-*****`のフォルダを1つ追加する
+#   - シャードの中身は列毎の`.npy`：`case`, `ClimateZone`, `Azimuth`(文字列), `NDT`, `etaID`(整数), `WSSize`$(n, 18)$, `SCF`$(n, 3, 15, 26)$
+#   - シャードは一時フォルダに書いてから名前を変えるので、読み込み中や並列の追記でも書きかけのシャードは見えない
+#   - シャードの番号は既存の番号の最大値+1(途中のシャードを削除しても重ならない)。書き込みに失敗した場合は一時フォルダを削除する
+#   - シャードは名前の文字列ではなく番号(整数)の順に読む(`list_SCFStoreShards`)。番号が5桁を超えても追記の順になる
+# - `Output_SCFStore(StorePath, Cases, SCFs)`：ケースリストの行`Cases`(X.4 の形式)と計算結果`SCFs`を1シャードとして追記する
+# - `input_SCFStore(StorePath, Columns=None, Case=None)`：列の辞書を返す
+#   - `Columns`で読み込む列を限定する(`None`なら全列)。各列はシャードの順に連結する
+#   - `Case`を指定すると、そのケースの行だけを返す(各列の値, `SCF`は$(3, 15, 26)$)。同じケースが複数あれば最後に追記したもの
+#   - `.npy`は`mmap_mode="r"`で開くので、1ケース, 1列の読み込みでファイル全体は読まない
+
+# In[43]:
+
+
+""" 計算結果の保存(列形式) """
+import numpy as np
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+SCFStoreColumns = ["case", "ClimateZone", "Azimuth", "NDT", "etaID", "WSSize", "SCF"]
+
+def Output_SCFStore(StorePath, Cases, SCFs):
+    # Cases:ケースリストの行 [case, Path00, FileName00, FileName01, ClimateZone, NDT, etaID, Azimuth, X1～Zym, ...]
+    # SCFs:各ケースの SCF[h][i][j]
+    
+    Columns = {"case": np.array([str(Case[0]) for Case in Cases]),
+               "ClimateZone": np.array([str(Case[4]) for Case in Cases]),
+               "Azimuth": np.array([str(Case[7]) for Case in Cases]),
+               "NDT": np.array([Case[5] for Case in Cases], dtype=np.int32),
+               "etaID": np.array([Case[6] for Case in Cases], dtype=np.int32),
+               "WSSize": np.array([Case[8:26] for Case in Cases], dtype=np.float64).reshape(-1, 18),
+               "SCF": np.array(SCFs, dtype=np.float64).reshape(-1, 3, 15, 26)}
+    
+    """ 一時フォルダに列毎に書いてから、既存の最大の番号+1のシャードに名前を変える """
+        # 並列の追記で番号が取られていれば、番号を取り直す
+    os.makedirs(StorePath, exist_ok=True)
+    TempPath = tempfile.mkdtemp(dir=StorePath, suffix=".tmp")
+    try:
+        for [Name, Column] in Columns.items():
+            np.save(os.path.join(TempPath, Name + ".npy"), Column)
+        while True:
+            ShardPath = os.path.join(StorePath, "part-{:05d}".format(calc_SCFStoreNext(StorePath)))
+            try:
+                os.rename(TempPath, ShardPath)
+                return ShardPath
+            except OSError:
+                if not os.path.exists(ShardPath):
+                    raise
+    except BaseException:
+        shutil.rmtree(TempPath, ignore_errors=True)
+        raise
+
+
+def list_SCFStoreShards(StorePath):
+    # 既存のシャード part-***** を番号(整数)の順に並べる → 5桁を超える番号も追記の順になる
+    
+    Shards = [[int(os.path.basename(ShardPath)[5:]), ShardPath] for ShardPath in glob.glob(os.path.join(StorePath, "part-*"))
+              if os.path.basename(ShardPath)[5:].isdigit()]
+    
+    return sorted(Shards)
+        # [[番号, シャードのパス], ...]
+
+
+def calc_SCFStoreNext(StorePath):
+    # 次のシャードの番号 = 既存のシャード part-***** の番号の最大値 + 1
+    
+    Shards = list_SCFStoreShards(StorePath)
+    
+    return Shards[-1][0] + 1 if len(Shards) > 0 else 0
+
+
+def input_SCFStore(StorePath, Columns=None, Case=None):
+    
+    Shards = [ShardPath for [Number, ShardPath] in list_SCFStoreShards(StorePath)]
+    if len(Shards) == 0:
+        sys.exit("計算結果のストアがありません")
+    if Columns is None:
+        Columns = SCFStoreColumns
+    
+    """ 1ケースの読み込み → case 列からシャードと行を探す """
+    if Case is not None:
+        for ShardPath in Shards[::-1]:
+            Rows = np.flatnonzero(np.load(os.path.join(ShardPath, "case.npy"), mmap_mode="r") == str(Case))
+            if len(Rows) > 0:
+                return {Name: np.array(np.load(os.path.join(ShardPath, Name + ".npy"), mmap_mode="r")[Rows[-1]])
+                        for Name in Columns}
+        sys.exit("計算結果のストアにケースがありません")
+    
+    """ 列の読み込み → シャードの順に連結 """
+    return {Name: np.concatenate([np.load(os.path.join(ShardPath, Name + ".npy"), mmap_mode="r") for ShardPath in Shards])
+            for Name in Columns}
 
+
+# ### F.14 メモリ使用量を抑えた分割計算
+# 
+# - 複数窓の一括計算(Main X.2)は`(N, 8760, NDT)`の配列を何組も作るので、窓数`N`や`NDT`が大きいとメモリが足りなくなる
+# - `calc_SCF_tiles`は、時間を月(`calc_Month`)毎に、窓を`MemoryBudget`[byte]に収まる数毎に区切って計算する
+#   - 1区切りの計算は時刻を指定した一括計算(F.10)で行い、1区切り分の配列だけを持つ
+#   - 1窓1か月でも収まらない場合は、月をさらに日単位で区切る
+#   - 1時間分割・1窓あたりの作業用メモリは`TileBytesPerStep`[byte]と見積もる(計算途中の配列を含めた`tracemalloc`の実測で約230byte, その2倍程度)
+#   - 地点毎の格子(F.5), 気象データなど、窓数によらない配列は`MemoryBudget`に含めない
+# - 区切り毎の分子分母は、`Output_ShadingCorrectionFactor`(E.3)と同じ積算先(`calc_OutputIndex`)へ`np.add.at`で加算する
+#   - 同じ積算先への加算は区切りによらず`Hour00`, `MM`の順となり、`np.bincount`と同じ順序で足すので、結果は区切り方によらず一括計算と一致する
+# - 窓毎の値(`Azwj`, `WSSize`の各要素, `Awj`, `gammayp`, `gammaym`, `etaisr`, `etakk`の各要素)は、X.2と同じくスカラーか`(N, 1, 1)`の形の配列とする
+# - 戻り値は、各窓の`SCF[h][i][j]`を積み重ねた`(N, 3, 15, 26)`の配列
+
+# In[44]:
+
+
+""" メモリ使用量を抑えた分割計算 """
+import numpy as np
+
+TileBytesPerStep = 512
+
+def calc_TileHours(SRHour, NDT, MemoryBudget):
+    # 月毎の時刻 Hour00 の区切り → 1窓分が MemoryBudget を超える場合は日単位でさらに区切る
+    
+    Month = calc_Month(SRHour.MMDDTT[0:8760])
+    Starts = np.flatnonzero(np.diff(Month, prepend=-1) != 0)
+    MaxHours = max(24, MemoryBudget // (NDT * TileBytesPerStep) // 24 * 24)
+    
+    Tiles = []
+    for [Start, End] in zip(Starts, list(Starts[1:]) + [8760]):
+        Tiles += [np.arange(Hour00, min(Hour00 + MaxHours, End)) for Hour00 in range(Start, End, MaxHours)]
+    
+    return Tiles
+
+
+def take_Windows(x, n0, n1):
+    # 窓の軸(先頭)を持つ値から n0～n1-1 番目の窓を取り出す, スカラーや窓の軸が1の値はそのまま
+    
+    return x[n0:n1] if np.ndim(x) > 0 and np.shape(x)[0] > 1 else x
+
+
+def calc_SCF_tiles(Grid, SRHour, Azwj, WSSize, Awj, gammayp, gammaym, etaisr, etakk, MemoryBudget, DType=np.float64):
+    
+    NDT = Grid.NDT
+    Values = [Azwj, Awj, gammayp, gammaym, etaisr] + list(WSSize) + list(etakk)
+    NWindows = max([np.shape(x)[0] for x in Values if np.ndim(x) > 0] + [1])
+    
+    """ 積算先のインデックス(E.3) → 窓毎に SCF[h] の 15*26 個を並べた (N, 2, 15*26) に加算する """
+    Index = calc_OutputIndex(SRHour, NDT, Grid)
+    SCF = np.zeros((NWindows, 2, 15 * 26))
+    
+    """ ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ 時間(月)の区切り ++++ """
+    for Hours in calc_TileHours(SRHour, NDT, MemoryBudget):
+        # 1区切りの積算先 → 期間×時刻, 期間×日積算, 月×時刻, 月×日積算 の順に並べる
+        Index00 = np.concatenate([x[Hours].ravel() for x in Index])
+        NStep = len(Hours) * NDT
+        Step = max(1, MemoryBudget // (NStep * TileBytesPerStep))
+        
+        """ ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++ 窓の区切り ++++ """
+        for n0 in range(0, NWindows, Step):
+            n1 = min(n0 + Step, NWindows)
+            [Azwj00, Awj00, gammayp00, gammaym00, etaisr00] = [take_Windows(x, n0, n1) for x in Values[0:5]]
+            WSSize00 = [take_Windows(x, n0, n1) for x in Values[5:23]]
+            etakk00 = [take_Windows(x, n0, n1) for x in Values[23:]]
+            
+            """ 時間分割毎の分子分母(F.10) → (2, n, len(Hours)*NDT) """
+            SCF01 = calc_SCF01_hours(Hours, Grid, SRHour.Sh, Azwj00, WSSize00, etakk00, etaisr00, Awj00
+                                     , gammayp00, gammaym00)
+            SCF01 = np.broadcast_to(SCF01.reshape(2, -1, NStep), (2, n1 - n0, NStep)).astype(DType)
+            
+            """ 分子分母の期間,月,時間毎の積算(E.3) → 4組分を続けて加算 """
+            Weights = np.concatenate([SCF01] * 4, axis=2).transpose(1, 0, 2)
+            Position = (np.arange(n0, n1)[:, None, None] * 2 + np.arange(2)[:, None]) * (15 * 26) + Index00
+            np.add.at(SCF.reshape(-1), Position.ravel(), Weights.ravel())
+    
+    """ 期間,月,時間毎の日よけ効果係数算出(E.1) """
+    SCF = np.concatenate([SCF, np.zeros((NWindows, 1, 15 * 26))], axis=1).reshape(NWindows, 3, 15, 26)
+    np.divide(SCF[:, 0], SCF[:, 1], out=SCF[:, 2], where=(SCF[:, 1] != 0))
+    
+    return SCF